@@ -1,12 +1,32 @@
-from PIL import Image
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import tempfile
+import numpy
 import os
 
+from animator.encoder import (
+    FFmpegEncoder, DEFAULT_PIX_FMT, DEFAULT_QUEUE_SIZE, concat_segments
+)
+from animator.timeline import Timeline, Track
+from animator.compositor import Compositor, NumpyCompositor
+from animator.fonts import preload_fonts
+from animator.interpolation import InterpolatedDrawables
+from animator.profiling import Profiler, NULL_PROFILER, SCENE, ENCODE, FRAME
+
 DEFAULT_FPS = 30
 DEFAULT_HEIGHT = 480
 DEFAULT_WIDTH = 640
 DEFAULT_DURATION = 10  # seconds
 DEFAULT_BACKGROUND = (0, 0, 0, 255)
+DEFAULT_WORKERS = 1  # compile frames in the current process
+DEFAULT_WINDOW = 8  # frames rendered ahead of the consumer
+DEFAULT_BACKEND = 'pil'
+DEFAULT_SEGMENTS = 1  # encode the whole video in a single ffmpeg process
+SEGMENT_SNAP = 0.25  # segment boundaries move up to this fraction to hit a scene cut
+BACKENDS = {
+    'pil': Compositor,  # frames are pillow images
+    'numpy': NumpyCompositor,  # frames are uint8 arrays of shape (height, width, 4)
+}
 
 
 class AnimatorConfig:
@@ -16,13 +36,29 @@ class AnimatorConfig:
             height=DEFAULT_HEIGHT,
             fps=DEFAULT_FPS,
             duration=DEFAULT_DURATION,
-            background=DEFAULT_BACKGROUND
+            background=DEFAULT_BACKGROUND,
+            pix_fmt=DEFAULT_PIX_FMT,
+            encoder_queue_size=DEFAULT_QUEUE_SIZE,
+            workers=DEFAULT_WORKERS,
+            window=DEFAULT_WINDOW,
+            fonts=(),
+            backend=DEFAULT_BACKEND,
+            segments=DEFAULT_SEGMENTS,
+            profile=False
             ):
         self.width = width
         self.height = height
         self.fps = fps
         self.duration = duration
         self.background = background
+        self.pix_fmt = pix_fmt  # raw format frames are streamed to ffmpeg in
+        self.encoder_queue_size = encoder_queue_size
+        self.workers = workers  # processes used by compile_frames
+        self.window = window  # max frames alive between rendering and encoding, at least workers
+        self.fonts = fonts  # (font path, size) tuples loaded at startup
+        self.backend = backend  # one of BACKENDS, compositing implementation
+        self.segments = segments  # chunks encoded concurrently by convert_to_video
+        self.profile = profile  # record time spent in rendering stages, see profiler
 
 
 class Animator:
@@ -33,13 +69,19 @@ class Animator:
     ----------
     _fps : frames per second
     _duration : duration of whole animation in seconds
-    _raw_frames : list(slots) for frames containing list of drawables
-    _compiled_frames : list(slots) for frames containing rendered/merged drawables
+    _raw_frames : dict of frame index to list of drawables added to that frame
+    _timeline : timeline holding tracks(drawables spanning multiple frames)
     _total_frames : total number of frames
     _height : height of each frame
     _width : width of each frame
     _background : background color
     _audio_path : path of audio
+    _workers : number of processes used to compile frames
+    _window : number of frames rendered ahead of the consumer
+    _fonts : list of (font path, size) preloaded in every process
+    _backend : name of the compositing backend
+    _profiler : animator.profiling.Profiler if profiling is enabled, else a
+        NullProfiler that records nothing
     """
     def __init__(self, config=AnimatorConfig()):
         self._config = config
@@ -48,57 +90,161 @@ class Animator:
         self._width = config.width
         self._duration = config.duration
         self._total_frames = self._duration * self._fps
-        self._raw_frames = [[] for _ in range(self._total_frames)]
-        self._compiled_frames = [None for _ in range(self._total_frames)]
+        self._raw_frames = {}  # sparse, only frames with objects are stored
+        self._timeline = Timeline()
         self._background = config.background
         self._video_config = {
             # for ffmpeg to take shortest  of images and audio into video
-            'shortest': True
+            'shortest': True,
+            'pix_fmt': config.pix_fmt,
+            'queue_size': config.encoder_queue_size,
+            'segments': config.segments,
         }
         self._audio_path = None
+        self._workers = config.workers
+        self._window = config.window
+        self._fonts = config.fonts
+        preload_fonts(self._fonts)
+        if config.backend not in BACKENDS:
+            raise Exception("Unknown backend, use one of " + ', '.join(BACKENDS))
+        self._backend = config.backend
+        self._profiler = Profiler() if config.profile else NULL_PROFILER
 
     @property
     def total_frames(self):
         return self._total_frames
 
+    @property
+    def profiler(self):
+        """
+        Times recorded while compiling and converting, e.g.
+            print(animator.profiler.summary())
+            animator.profiler.save_trace('/tmp/trace.json')
+        """
+        return self._profiler
+
     def add_frame_object(self, frame_index, drawable):
         """Add a drawable object to frame slot given by frame_index"""
         assert frame_index >= 0, "No negative indexing"
         assert frame_index < self._total_frames, "frames slot length exceeded"
-        self._raw_frames[frame_index].append(drawable)
+        self._raw_frames.setdefault(frame_index, []).append(drawable)
 
     def add_frames_objects(self, start_index, drawables):
         """Add drawable objects to multiple frames starting from start_index"""
+        if isinstance(drawables, InterpolatedDrawables):
+            # keep (view, index) references, drawables are created when rendered
+            for i in range(len(drawables)):
+                self.add_frame_object(start_index+i, (drawables, i))
+            return
         for i, drawable in enumerate(drawables):
             self.add_frame_object(start_index+i, drawable)
 
-    def compile_frames(self):
-        for ind, frame in enumerate(self._raw_frames):
-            image = Image.new('RGBA', (self._width, self._height), self._background)
-            for drawable in frame:
-                if type(drawable) != list:
-                    image.paste(drawable.render_to(image))
-                else:
-                    for x in drawable:
-                        image.paste(x.render_to(image))
-            self._compiled_frames[ind] = image
+    def add_track(self, drawable, start_frame=0, end_frame=None, interpolators=()):
+        """
+        Show a drawable from start_frame up to end_frame(exclusive, defaults to
+        the last frame). The drawable is stored once, and its state on each
+        frame is computed from interpolators when that frame is rendered.
+        Parameters
+        ----------
+        @drawable : the drawable object
+        @start_frame : first frame of the track
+        @end_frame : frame at which the track ends
+        @interpolators : list of timeline.Interpolator, e.g.
+            Interpolator(timeline.POSITION, (0, 0), (100, 100))
+        """
+        if end_frame is None:
+            end_frame = self._total_frames
+        assert end_frame <= self._total_frames, "frames slot length exceeded"
+        track = Track(drawable, start_frame, end_frame, interpolators)
+        return self._timeline.add_track(track)
+
+    def get_frame_drawables(self, index):
+        """Drawables of the frame at index, active tracks come first"""
+        frame = [
+            x[0][x[1]] if isinstance(x, tuple) else x
+            for x in self._raw_frames.get(index, [])
+        ]
+        return self._timeline.drawables_at(index) + frame
+
+    def compile_frames(self, workers=None, window=None):
+        """
+        Lazily render drawables of every frame slot, yielding frames in order.
+        At most `window` frames are rendered ahead of the consumer, so memory
+        use depends on the window and not on the length of the video. With
+        workers, the window is at least the number of workers: it is split in
+        chunks of window // workers frames and up to window // chunk chunks
+        are in flight, so every worker always has a chunk to render.
+        With the numpy backend, a frame is valid until the next one is
+        rendered, copy frames to keep them.
+        When profiling, a frame's time includes what the consumer does with
+        it(e.g. encoding) if frames are compiled in this process.
+        Parameters
+        ----------
+        @workers : number of processes to spread frame ranges over, defaults to
+            the configured workers. Drawables must be picklable to use more than one.
+        @window : number of frames rendered ahead, defaults to the configured window
+        """
+        workers = workers or self._workers
+        # a smaller window would leave workers idle
+        window = max(window or self._window, workers, 1)
+        if workers <= 1 or self._total_frames <= 1:
+            compositor = self.new_compositor()
+            for index in range(self._total_frames):
+                with self._profiler.span(FRAME, frame=index):
+                    yield self.render_frame(compositor, index)
+            return
+        # split the window among workers, each task renders a small frame range
+        chunk_size = window // workers
+        pending = deque()
+        next_index = 0
+        # the scene is sent once to every worker, tasks only carry frame ranges
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self,)
+                ) as executor:
+            while next_index < self._total_frames or pending:
+                while next_index < self._total_frames and \
+                        len(pending) * chunk_size < window:
+                    stop = min(next_index + chunk_size, self._total_frames)
+                    pending.append(executor.submit(_compile_frame_range, next_index, stop))
+                    next_index = stop
+                # yield in submission order, so frames stay in order
+                frames, records = pending.popleft().result()
+                self._profiler.extend(records)
+                for frame in frames:
+                    yield frame
+
+    def new_compositor(self):
+        compositor = BACKENDS[self._backend]
+        return compositor((self._width, self._height), self._background, self._profiler)
+
+    def render_frame(self, compositor, index):
+        """Render drawables of the frame at index with compositor"""
+        with self._profiler.span(SCENE, frame=index):
+            drawables = self.get_frame_drawables(index)
+        return compositor.render(drawables)
 
     def get_compiled_frame(self, index):
-        return self._compiled_frames[index]
+        """Render the frame at index on demand"""
+        return self.render_frame(self.new_compositor(), index)
 
     def get_compiled_frames(self):
-        return self._compiled_frames
+        return self.compile_frames()
 
     def add_audio(self, audiopath):
         self._audio_path = audiopath
 
-    def convert_to_video(self, video_path=None):
+    def convert_to_video(self, video_path=None, segments=None):
         """
         This should be in .mp4 format
+        Parameters
+        ----------
+        @video_path : path of the video
+        @segments : number of chunks the timeline is split into, each chunk is
+            rendered and encoded by a separate process and ffmpeg, defaults to
+            the configured segments
         """
-        if not self._compiled_frames:
-            raise Exception("You have not compiled frames. Please call compile_frames() first")
-
         if not video_path:
             raise Exception("Please provide video path with name, only mp4 videos will be generated")
         path_splitted = video_path.split('/')
@@ -109,33 +255,126 @@ class Animator:
                 raise Exception("Please provide video path with name, only mp4 videos will be generated")
             path = '/'.join(path_splitted[:-1]) + '/' + path_splitted[-1].split('.')[0]
         path = path + '.mp4'
-        # ffmpeg to the rescue
-        for i, frame in enumerate(self.get_compiled_frames()):
-            frame.save('/tmp/frame{}.png'.format(i), subsampling=0, quality=50)
-        ffmpeg_command = "ffmpeg -r {fps} -s {width}x{height} -i /tmp/frame%d.png {audio_input} -shortest -crf 20 -b 4M -c:v h264 {video_path}"
-        if self._audio_path:
-            audio_input = "-i " + self._audio_path.replace(' ', '@#@#')
-        else:
-            audio_input = ''
-        command = ffmpeg_command.format(
-            fps=self._fps,
-            width=self._width,
-            height=self._height,
-            audio_input=audio_input,
-            video_path=path
-        )
-        try:
-            command = command.split()
-            command = list(map(lambda x: x.replace('@#@#', ' '), command))
-            print(command)
-            subprocess.run(command)
-        except Exception as e:
-            print("Something went wrong." + e)
-        else:
-            # delete files
-            files = os.listdir('/tmp/')
-            for f in files:
-                if f.endswith(".png"):
-                    os.remove(os.path.join('/tmp', f))
-            # subprocess.run(["rm", "/tmp/frame*.png"], shell=True)
+        segments = min(segments or self._video_config['segments'], self._total_frames)
+        if segments > 1:
+            self._convert_segments(path, segments)
+            print("Converted video")
+            return
+        # ffmpeg to the rescue, frames are piped straight into its stdin
+        encoder = self.new_encoder(path, audio_path=self._audio_path)
+        # each frame is dropped as soon as ffmpeg has consumed it
+        with encoder:
+            for index, frame in enumerate(self.compile_frames()):
+                with self._profiler.span(ENCODE, frame=index):
+                    encoder.write_frame(frame)
+            with self._profiler.span(ENCODE):  # wait for ffmpeg to finish
+                encoder.close()
         print("Converted video")
+
+    def new_encoder(self, path, audio_path=None, threads=None):
+        return FFmpegEncoder(
+            path,
+            self._width,
+            self._height,
+            self._fps,
+            audio_path=audio_path,
+            pix_fmt=self._video_config['pix_fmt'],
+            queue_size=self._video_config['queue_size'],
+            threads=threads
+        )
+
+    def get_segment_boundaries(self, segments):
+        """
+        Split frames into segments of about equal length. A boundary is moved
+        to a nearby frame where a track starts or ends(scene cut), if any.
+        """
+        length = self._total_frames / float(segments)
+        cuts = sorted({
+            x for track in self._timeline.tracks
+            for x in (track.start_frame, track.end_frame)
+            if 0 < x < self._total_frames
+        })
+        boundaries = [0]
+        for i in range(1, segments):
+            boundary = round(i * length)
+            nearby = [x for x in cuts if abs(x - boundary) <= length * SEGMENT_SNAP]
+            if nearby:
+                boundary = min(nearby, key=lambda x: abs(x - boundary))
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        return boundaries + [self._total_frames]
+
+    def _convert_segments(self, path, segments):
+        boundaries = self.get_segment_boundaries(segments)
+        ranges = list(zip(boundaries, boundaries[1:]))
+        # share cpus between the concurrent encoders
+        threads = max((os.cpu_count() or 1) // len(ranges), 1)
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            paths = [
+                os.path.join(tmp, 'segment{:05d}.mp4'.format(i))
+                for i in range(len(ranges))
+            ]
+            with ProcessPoolExecutor(
+                    max_workers=len(ranges),
+                    initializer=_init_worker,
+                    initargs=(self,)
+                    ) as executor:
+                futures = [
+                    executor.submit(_encode_segment, start, stop, segment_path, threads)
+                    for (start, stop), segment_path in zip(ranges, paths)
+                ]
+                for future in futures:
+                    # raises errors of workers
+                    self._profiler.extend(future.result())
+            # audio is muxed once, while losslessly joining the segments
+            concat_segments(paths, path, audio_path=self._audio_path)
+
+
+_worker_animator = None
+
+
+def _init_worker(animator):
+    global _worker_animator
+    _worker_animator = animator
+    # the copy of the parent's profiler has the parent's records, start empty
+    # so that only this worker's records are sent back
+    animator._profiler = Profiler() if animator.profiler.enabled else NULL_PROFILER
+    preload_fonts(animator._fonts)
+
+
+def _compile_frame_range(start, stop):
+    """
+    Render frames from start to stop in a worker process. This is module level
+    so that it can be pickled.
+    """
+    animator = _worker_animator
+    compositor = animator.new_compositor()
+    frames = []
+    for x in range(start, stop):
+        with animator.profiler.span(FRAME, frame=x):
+            frame = animator.render_frame(compositor, x)
+            if isinstance(frame, numpy.ndarray):
+                frame = frame.copy()  # the numpy backend reuses its frame buffer
+            frames.append(frame)
+    # records of this worker are sent back with the frames
+    return frames, animator.profiler.pop_records()
+
+
+def _encode_segment(start, stop, path, threads):
+    """
+    Render frames from start to stop and encode them in a worker process,
+    returns profiler records of the worker
+    """
+    animator = _worker_animator
+    profiler = animator.profiler
+    compositor = animator.new_compositor()
+    with animator.new_encoder(path, threads=threads) as encoder:
+        for x in range(start, stop):
+            with profiler.span(FRAME, frame=x):
+                frame = animator.render_frame(compositor, x)
+                with profiler.span(ENCODE, frame=x):
+                    encoder.write_frame(frame)
+        with profiler.span(ENCODE):
+            encoder.close()
+    return profiler.pop_records()
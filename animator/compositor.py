@@ -0,0 +1,200 @@
+from PIL import Image
+import numpy
+
+from animator.elements.drawable import NotImplementedError
+from animator.profiling import NULL_PROFILER, RASTERIZE, COMPOSITE
+
+
+class Compositor:
+    """
+    Composites drawables of consecutive frames into images
+
+    Drawables that are the same objects, in the same order, at the bottom of
+    consecutive frames are static. They are rendered once into a cached layer,
+    and each frame starts from a copy of that layer, so only the drawables that
+    changed are rendered again.
+
+    Attributes
+    ----------
+    _size : (width, height) of frames
+    _background : background color
+    _layer : cached image of background with static drawables rendered on it
+    _layer_drawables : drawables rendered into _layer, in order
+    _previous : drawables of the previous frame
+    _profiler : animator.profiling profiler, render_to() of drawables is
+        recorded as rasterize time, it includes compositing onto the frame
+    """
+    def __init__(self, size, background, profiler=NULL_PROFILER):
+        self._size = size
+        self._background = background
+        self._layer = None
+        self._layer_drawables = []
+        self._previous = []
+        self._profiler = profiler
+
+    def render(self, drawables):
+        """Render drawables(which may contain lists of drawables) into an image"""
+        drawables = _flatten(drawables)
+        static_count = _common_prefix_length(drawables, self._previous)
+        self._previous = drawables
+
+        cached_count = _common_prefix_length(drawables, self._layer_drawables)
+        if self._layer is None or cached_count < len(self._layer_drawables):
+            # cached layer has drawables not in this frame, start over
+            self._layer = Image.new('RGBA', self._size, self._background)
+            self._layer_drawables = []
+            cached_count = 0
+        if static_count > cached_count:
+            # more drawables became static, add them to the layer
+            for drawable in drawables[cached_count:static_count]:
+                self._layer = self._render_to(drawable, self._layer)
+            self._layer_drawables = drawables[:static_count]
+        cached_count = len(self._layer_drawables)
+
+        with self._profiler.span(COMPOSITE):
+            image = self._layer.copy()
+        for drawable in drawables[cached_count:]:
+            image = self._render_to(drawable, image)
+        return image
+
+    def _render_to(self, drawable, image):
+        with self._profiler.span(RASTERIZE, type(drawable).__name__):
+            return drawable.render_to(image)
+
+
+class NumpyCompositor:
+    """
+    Composites drawables into preallocated float32 NumPy buffers
+
+    Frames are kept as premultiplied RGBA buffers, and each drawable's layer is
+    blended in place over its bounding box only. The buffers are reused between
+    frames, frames are converted to uint8 (height, width, 4) arrays only when
+    they are handed out, ready to be written to the encoder as raw bytes.
+    The uint8 frame is reused too, it is valid until the next render(), copy it
+    to keep it longer.
+    Static drawables are cached in a layer buffer like in Compositor.
+
+    Attributes
+    ----------
+    _size : (width, height) of frames
+    _opaque : if background is opaque, so that frames need not be unpremultiplied
+    _layer : premultiplied buffer with background and static drawables
+    _layer_drawables : drawables blended into _layer, in order
+    _frame : premultiplied buffer the current frame is composited in
+    _scaled : float32 buffer the frame is scaled to 0-255 in
+    _out : uint8 frame returned by render()
+    _previous : drawables of the previous frame
+    _profiler : animator.profiling profiler
+    """
+    def __init__(self, size, background, profiler=NULL_PROFILER):
+        self._size = size
+        self._profiler = profiler
+        width, height = size
+        self._opaque = len(background) < 4 or background[3] == 255
+        color = numpy.array(background, dtype=numpy.float32) / 255
+        if len(color) < 4:
+            color = numpy.append(color, numpy.float32(1))
+        color[:3] *= color[3]
+        self._background = color
+        self._layer = numpy.empty((height, width, 4), dtype=numpy.float32)
+        self._layer[:] = color
+        self._layer_drawables = []
+        self._frame = numpy.empty_like(self._layer)
+        self._scaled = numpy.empty_like(self._layer)
+        self._out = numpy.empty((height, width, 4), dtype=numpy.uint8)
+        self._previous = []
+
+    def render(self, drawables):
+        """Render drawables into a uint8 RGBA array of shape (height, width, 4)"""
+        drawables = _flatten(drawables)
+        static_count = _common_prefix_length(drawables, self._previous)
+        self._previous = drawables
+
+        cached_count = _common_prefix_length(drawables, self._layer_drawables)
+        if cached_count < len(self._layer_drawables):
+            self._layer[:] = self._background
+            self._layer_drawables = []
+            cached_count = 0
+        if static_count > cached_count:
+            for drawable in drawables[cached_count:static_count]:
+                self._blend(self._layer, drawable)
+            self._layer_drawables = drawables[:static_count]
+        cached_count = len(self._layer_drawables)
+
+        with self._profiler.span(COMPOSITE):
+            numpy.copyto(self._frame, self._layer)
+        for drawable in drawables[cached_count:]:
+            self._blend(self._frame, drawable)
+        with self._profiler.span(COMPOSITE):
+            return self._to_uint8(self._frame)
+
+    def _blend(self, buffer, drawable):
+        """Blend drawable's layer over buffer in place"""
+        with self._profiler.span(RASTERIZE, type(drawable).__name__):
+            # AttributeErrors raised inside get_layer are bugs, not a missing layer
+            get_layer = getattr(drawable, 'get_layer', None)
+            layer = None
+            if get_layer is not None:
+                try:
+                    layer, position = get_layer()
+                except NotImplementedError:
+                    pass
+            if layer is None:
+                # drawable can only render to an image, render it to a whole frame
+                layer = drawable.render_to(Image.new('RGBA', self._size, (0, 0, 0, 0)))
+                position = (0, 0)
+        with self._profiler.span(COMPOSITE):
+            self._blend_layer(buffer, layer, position)
+
+    def _blend_layer(self, buffer, layer, position):
+        x, y = int(position[0]), int(position[1])
+        height, width = buffer.shape[:2]
+        left, top = max(-x, 0), max(-y, 0)
+        right = min(layer.size[0], width - x)
+        bottom = min(layer.size[1], height - y)
+        if right <= left or bottom <= top:
+            return  # completely outside
+        src = numpy.asarray(layer, dtype=numpy.float32)[top:bottom, left:right]
+        src *= 1 / 255.
+        alpha = src[..., 3:]
+        src[..., :3] *= alpha
+        region = buffer[y+top:y+bottom, x+left:x+right]
+        region *= 1 - alpha
+        region += src
+
+    def _to_uint8(self, buffer):
+        """Convert buffer into the preallocated uint8 frame, which is returned"""
+        scaled = self._scaled
+        if self._opaque:
+            # alpha stays 1 over an opaque background, no need to unpremultiply
+            numpy.multiply(buffer, 255, out=scaled)
+        else:
+            alpha = buffer[..., 3:]
+            scaled[..., :3] = 0
+            numpy.divide(buffer[..., :3], alpha, out=scaled[..., :3], where=alpha > 0)
+            scaled[..., 3:] = alpha
+            numpy.multiply(scaled, 255, out=scaled)
+        numpy.add(scaled, 0.5, out=scaled)
+        numpy.clip(scaled, 0, 255, out=scaled)
+        numpy.copyto(self._out, scaled, casting='unsafe')
+        return self._out
+
+
+def _flatten(drawables):
+    flat = []
+    for drawable in drawables:
+        if isinstance(drawable, list):
+            flat.extend(drawable)
+        else:
+            flat.append(drawable)
+    return flat
+
+
+def _common_prefix_length(first, second):
+    """Number of leading items that are the same objects in both lists"""
+    count = 0
+    for x, y in zip(first, second):
+        if x is not y:
+            break
+        count += 1
+    return count
@@ -1,3 +1,4 @@
 from .circle import Circle, CircleConfig
 from .text import Text, TextConfig
 from .latex import TEX, TEXConfig
+from .particles import Particles, ParticlesConfig
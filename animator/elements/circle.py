@@ -1,5 +1,8 @@
 from animator.elements.drawable import Drawable
-from PIL import ImageDraw
+from animator.timeline import POSITION, RADIUS, COLOR, ALPHA
+from animator.interpolation import interpolate, InterpolatedDrawables, DEFAULT_EASING
+from animator.raster import circle_layer
+import math
 
 DEFAULT_COLOR = (255, 0, 0, 255)
 DEFAULT_RADIUS = 20
@@ -31,6 +34,8 @@ class Circle(Drawable):
     _color : color of the circle
     _opacity: opacity of the circle
     """
+    __slots__ = ('_center', '_radius', '_filled', '_color', '_stroke', '_opacity')
+
     def __init__(self, config):
         self._center = config.center
         self._radius = config.radius
@@ -45,46 +50,45 @@ class Circle(Drawable):
             self._center[0]+self._radius, self._center[1]+self._radius
         )
 
-    def render_to(self, image):
+    def get_layer(self):
         """
-        Return image object corresponding to the attributes.
-        Parameters
-        ----------
-        image : a pillow Image object to which the circle is rendered
+        Return the anti-aliased circle drawn on a layer of its bounding box's size
         """
-        draw = ImageDraw.Draw(image)
-        draw.ellipse(self.get_bounding_box(), fill=self._color)
-        return image
+        x0, y0, x1, y1 = self.get_bounding_box()
+        left, top = math.floor(x0), math.floor(y0)
+        size = (math.ceil(x1) - left + 1, math.ceil(y1) - top + 1)
+        center = (self._center[0] - left, self._center[1] - top)
+        return circle_layer(size, center, self._radius, self._color), (left, top)
 
     def copy(self):
-        c = Circle(CircleConfig())
-        c._center = self._center
-        c._radius = self._radius
-        c._filled = self._filled
-        c._color = self._color
-        return c
+        return self._shallow_copy(Circle)
 
-    def translate(self, vector, frames=1):
+    def set_property(self, prop, value):
+        if prop == POSITION:
+            self._center = value
+        elif prop == RADIUS:
+            self._radius = value
+        elif prop == COLOR:
+            self._color = tuple(int(x) for x in value)
+        elif prop == ALPHA:
+            self._color = (*self._color[:3], int(255*value))
+        else:
+            raise Exception("Circle has no property " + prop)
+
+    def translate(self, vector, frames=1, easing=DEFAULT_EASING):
         """
         Return translated object/s
         Parameters
         ----------
         @vector : (x, y) is the vector which will translate the object
         @frames : if provided returns objects by interpolating positions in the frames
+        @easing : one of animator.interpolation.EASINGS
         """
+        end = (self._center[0]+vector[0], self._center[1]+vector[1])
         if frames <= 1:
             new = self.copy()
-            new._center = (
-                self._center[0]+vector[0],
-                self._center[1]+vector[1]
-            )
+            new._center = end
             return [new]
-        else:
-            inc_x = vector[0]/float(frames)
-            inc_y = vector[1]/float(frames)
-            circles = []
-            curr_circle = self.copy()
-            for x in range(frames):
-                circles.append(curr_circle)
-                curr_circle = curr_circle.translate((inc_x, inc_y), frames=1)[0]
-            return circles
+        # all positions are computed at once, circles are created on access
+        positions = interpolate(self._center, end, frames, easing)
+        return InterpolatedDrawables(self, {POSITION: positions})
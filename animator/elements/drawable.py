@@ -5,11 +5,30 @@ class NotImplementedError(Exception):
 class Drawable:
     """
     Drawable object that can be rendered in animation frame
+
+    Drawables use __slots__ so that scenes with many of them stay compact.
     """
+    __slots__ = ()
+
     def __init__(self):
         pass
 
     def render_to(self, image):
+        """
+        Composite the drawable's layer onto image in place and return image
+        """
+        layer, position = self.get_layer()
+        return composite_layer(image, layer, position)
+
+    def get_layer(self):
+        """
+        Return (layer, position) where layer is an RGBA image as small as the
+        bounding box, and position is where its top left goes in the frame
+        """
+        raise NotImplementedError
+
+    def get_bounding_box(self):
+        """(left, top, right, bottom) of the drawable in the frame"""
         raise NotImplementedError
 
     def transform(self):
@@ -18,10 +37,41 @@ class Drawable:
     def copy(self):
         raise NotImplementedError
 
+    def _shallow_copy(self, cls):
+        """New cls object with slot attributes of self, without a config"""
+        new = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(new, name, getattr(self, name))
+        return new
+
     def translate(self, vector, frames=1):
-        """vector is a tuple (x, y)"""
+        """
+        vector is a tuple (x, y), returns a sequence of frames drawables, see
+        animator.interpolation.InterpolatedDrawables
+        """
         raise NotImplementedError
 
     def get_config(self):
         """Get the config"""
         raise NotImplementedError
+
+    def set_property(self, prop, value):
+        """Set a property(one of animator.timeline properties), used by tracks"""
+        raise NotImplementedError
+
+
+def composite_layer(image, layer, position):
+    """
+    Alpha composite layer onto RGBA image in place with layer's top left at
+    position. Parts of the layer outside of the image are clipped.
+    """
+    x, y = int(position[0]), int(position[1])
+    left, top = max(-x, 0), max(-y, 0)
+    right = min(layer.size[0], image.size[0] - x)
+    bottom = min(layer.size[1], image.size[1] - y)
+    if right <= left or bottom <= top:
+        return image  # completely outside
+    if (left, top, right, bottom) != (0, 0, *layer.size):
+        layer = layer.crop((left, top, right, bottom))
+    image.alpha_composite(layer, (x + left, y + top))
+    return image
@@ -1,12 +1,12 @@
 from animator.elements.drawable import Drawable
-
-from PIL import Image
-import subprocess
+from animator.timeline import POSITION, ALPHA
+from animator import texcache
 
 DEFAULT_COLOR = (127, 255, 212, 255)
 DEFAULT_POSITION = (100, 50)
 DEFAULT_BACKGROUND = (0, 0, 0, 0)
 DEFAULT_ALPHA = 1
+DEFAULT_DPI = texcache.DEFAULT_DPI
 
 
 class TEXConfig:
@@ -16,13 +16,15 @@ class TEXConfig:
             position=DEFAULT_POSITION,
             color=DEFAULT_COLOR,
             background=DEFAULT_BACKGROUND,
-            alpha=DEFAULT_ALPHA
+            alpha=DEFAULT_ALPHA,
+            dpi=DEFAULT_DPI
             ):
         self.formula = formula
         self.position = position
         self.color = color
         self.background = background
         self.alpha = alpha
+        self.dpi = dpi
 
 
 class TEX(Drawable):
@@ -35,13 +37,20 @@ class TEX(Drawable):
     _formula: the formula
     _position: position of the formula
     _background: background color
+    _dpi: resolution the formula is rendered at
+    _image: rendered formula
     """
+    __slots__ = (
+        '_color', '_formula', '_position', '_background', '_alpha', '_dpi', '_image'
+    )
+
     def __init__(self, config=TEXConfig(), image=None):
         self._color = config.color
         self._formula = config.formula
         self._position = config.position
         self._background = config.background
         self._alpha = config.alpha
+        self._dpi = config.dpi
         if not image:
             self._image = self._create_image()
         else:
@@ -54,8 +63,20 @@ class TEX(Drawable):
         conf.position = self._position
         conf.alpha = self._alpha
         conf.background = self._background
+        conf.dpi = self._dpi
         return conf
 
+    def copy(self):
+        return self._shallow_copy(TEX)
+
+    def set_property(self, prop, value):
+        if prop == POSITION:
+            self._position = tuple(int(x) for x in value)
+        elif prop == ALPHA:
+            self._alpha = value
+        else:
+            raise Exception("TEX has no property " + prop)
+
     def fade_in(self, frames=2, start_opacity=0, final_opacity=1):
         """
         fade in from start_opacity to final_opacity
@@ -84,31 +105,32 @@ class TEX(Drawable):
             texobjs.append(TEX(conf, self._image))
         return texobjs
 
-    def render_to(self, image):
+    def get_layer(self):
         if not self._image:
             img = self._create_image()
             self._image = img
-        size = self._image.size
-        maskimage = Image.new('RGBA', size)
-        newim = Image.blend(maskimage, self._image, self._alpha)
-        image.paste(newim, self._position, newim)
-        return image
+        if self._alpha >= 1:
+            return self._image, self._position
+        layer = self._image.copy()
+        alpha = self._alpha
+        layer.putalpha(layer.getchannel('A').point(lambda x: int(x * alpha)))
+        return layer, self._position
+
+    def get_bounding_box(self):
+        if not self._image:
+            self._image = self._create_image()
+        x, y = self._position
+        return (x, y, x + self._image.size[0], y + self._image.size[1])
 
     def _create_image(self):
         """
-            Create image using shell commands and tools
+            Create image using tex2im, renders are cached on disk(see texcache)
         """
         if hasattr(self, '_image') and self._image:
             return self._image
         try:
-            command = "tex2im -b transparent -t cyan"
-            subprocess.run([*command.split(), self._formula])
+            return texcache.get_image(self._formula, self._color, self._dpi)
         except Exception as e:
             import traceback
             print(traceback.format_exc())
             return None
-        # tex2im converts to out.png by default
-        img = Image.open('out.png').convert('RGBA')
-        # create a new rgba image to blend the latex with the alpha
-        subprocess.run(["rm", "out.png"])
-        return img
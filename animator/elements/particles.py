@@ -0,0 +1,186 @@
+from animator.elements.drawable import Drawable
+from animator.elements.circle import Circle, DEFAULT_COLOR, DEFAULT_RADIUS
+from animator.timeline import POSITION, RADIUS, COLOR, ALPHA
+from animator.interpolation import interpolate, InterpolatedDrawables, DEFAULT_EASING
+from animator.raster import draw_circles
+from PIL import Image
+import numpy
+import math
+
+DEFAULT_POSITION = (0, 0)
+
+
+class ParticlesConfig:
+    def __init__(
+            self,
+            centers=(),
+            radii=DEFAULT_RADIUS,
+            colors=DEFAULT_COLOR,
+            position=DEFAULT_POSITION
+            ):
+        """
+        @centers : sequence of (x, y) or array of shape (N, 2)
+        @radii : one radius for all particles, or one per particle
+        @colors : one RGBA color for all particles, or one per particle
+        @position : offset added to all the centers
+        """
+        self.centers = centers
+        self.radii = radii
+        self.colors = colors
+        self.position = position
+
+
+class Particles(Drawable):
+    """
+    Many circles stored as parallel arrays instead of one object per circle.
+    They are drawn together onto a single layer in one batch, overlapping
+    particles are blended in order.
+
+    Attributes
+    ----------
+    _centers : float array of shape (N, 2), centers relative to _position
+    _radii : float array of shape (N,)
+    _colors : uint8 array of shape (N, 4), RGBA colors
+    _position : (x, y) offset of all the particles, what translate() moves
+    """
+    __slots__ = ('_centers', '_radii', '_colors', '_position')
+
+    def __init__(self, config=ParticlesConfig()):
+        self._centers = numpy.array(config.centers, dtype=numpy.float64).reshape(-1, 2)
+        count = len(self._centers)
+        self._radii = numpy.broadcast_to(
+            numpy.asarray(config.radii, dtype=numpy.float64), (count,)
+        ).copy()
+        self._colors = numpy.broadcast_to(
+            numpy.asarray(config.colors, dtype=numpy.uint8), (count, 4)
+        ).copy()
+        self._position = config.position
+
+    def __len__(self):
+        return len(self._centers)
+
+    def __getitem__(self, index):
+        """Circle compatible view of a particle, setting its properties writes to the arrays"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index out of range")
+        return ParticleView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ParticleView(self, index)
+
+    def get_bounding_box(self):
+        if not len(self):
+            return (self._position[0], self._position[1]) * 2
+        x, y = self._centers[:, 0] + self._position[0], self._centers[:, 1] + self._position[1]
+        return (
+            float((x - self._radii).min()), float((y - self._radii).min()),
+            float((x + self._radii).max()), float((y + self._radii).max())
+        )
+
+    def get_layer(self):
+        """
+        Return all the particles drawn on one layer of the bounding box's size.
+        They are rasterized in chunks of about raster.MAX_PIXELS pixels, so
+        memory grows with the layer's size, not with the pixels they cover.
+        """
+        x0, y0, x1, y1 = self.get_bounding_box()
+        left, top = math.floor(x0), math.floor(y0)
+        size = (math.ceil(x1) - left + 1, math.ceil(y1) - top + 1)
+        layer = Image.new('RGBA', size, (0, 0, 0, 0))
+        centers = self._centers + (self._position[0] - left, self._position[1] - top)
+        draw_circles(layer, centers, self._radii, self._colors)
+        return layer, (left, top)
+
+    def copy(self):
+        new = Particles.__new__(Particles)
+        new._centers = self._centers.copy()
+        new._radii = self._radii.copy()
+        new._colors = self._colors.copy()
+        new._position = self._position
+        return new
+
+    def get_config(self):
+        return ParticlesConfig(
+            self._centers.copy(), self._radii.copy(), self._colors.copy(), self._position
+        )
+
+    def set_property(self, prop, value):
+        """Properties other than position apply to all the particles"""
+        if prop == POSITION:
+            self._position = value
+        elif prop == RADIUS:
+            self._radii = numpy.full(len(self), value, dtype=numpy.float64)
+        elif prop == COLOR:
+            self._colors = numpy.tile(numpy.asarray(value, dtype=numpy.uint8), (len(self), 1))
+        elif prop == ALPHA:
+            self._colors = self._colors.copy()
+            self._colors[:, 3] = int(255*value)
+        else:
+            raise Exception("Particles have no property " + prop)
+
+    def translate(self, vector, frames=1, easing=DEFAULT_EASING):
+        """
+        Return translated object/s, all particles move together
+        Parameters
+        ----------
+        @vector : (x, y) is the vector which will translate the particles
+        @frames : if provided returns objects by interpolating positions in the frames
+        @easing : one of animator.interpolation.EASINGS
+        """
+        end = (self._position[0]+vector[0], self._position[1]+vector[1])
+        if frames <= 1:
+            new = self.copy()
+            new._position = end
+            return [new]
+        positions = interpolate(self._position, end, frames, easing)
+        return InterpolatedDrawables(self, {POSITION: positions})
+
+
+class ParticleView(Circle):
+    """
+    A single particle of Particles, behaves like a Circle. copy() returns an
+    independent Circle.
+
+    Attributes
+    ----------
+    _particles : the Particles object
+    _index : index of the particle
+    """
+    __slots__ = ('_particles', '_index')
+
+    def __init__(self, particles, index):
+        self._particles = particles
+        self._index = index
+        self._filled = True
+        self._stroke = 1
+        self._opacity = 1
+
+    @property
+    def _center(self):
+        x, y = self._particles._centers[self._index].tolist()
+        position = self._particles._position
+        return (x + position[0], y + position[1])
+
+    @_center.setter
+    def _center(self, value):
+        position = self._particles._position
+        self._particles._centers[self._index] = (value[0] - position[0], value[1] - position[1])
+
+    @property
+    def _radius(self):
+        return self._particles._radii[self._index].item()
+
+    @_radius.setter
+    def _radius(self, value):
+        self._particles._radii[self._index] = value
+
+    @property
+    def _color(self):
+        return tuple(self._particles._colors[self._index].tolist())
+
+    @_color.setter
+    def _color(self, value):
+        self._particles._colors[self._index] = value
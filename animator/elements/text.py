@@ -1,5 +1,9 @@
-from animator.elements.drawable import Drawable
-from PIL import ImageDraw, ImageFont, Image
+from animator.elements.drawable import Drawable, composite_layer
+from animator.timeline import POSITION, COLOR, ALPHA, LENGTH
+from animator.fonts import get_font
+from animator.glyphs import get_glyph_run
+from animator.interpolation import interpolate, InterpolatedDrawables, DEFAULT_EASING
+from PIL import Image
 import math
 
 DEFAULT_COLOR = (0, 0, 255, 255)
@@ -15,13 +19,15 @@ class TextConfig:
             color=DEFAULT_COLOR,
             size=DEFAULT_SIZE,
             position=DEFAULT_POSITION,
-            font="Ubuntu-R.ttf"
+            font="Ubuntu-R.ttf",
+            length=None
             ):
         self.text = text
         self.color = color
         self.size = size
         self.position = position
         self.font = font
+        self.length = length  # number of visible characters, None for all
 
     def copy(self):
         return TextConfig(
@@ -29,7 +35,8 @@ class TextConfig:
             self.color,
             self.size,
             self.position,
-            self.font
+            self.font,
+            self.length
         )
 
 
@@ -42,8 +49,13 @@ class Text(Drawable):
     _color : color of the text
     _text : the text to be rendered
     _size : the size of the text
+    _length : number of characters visible, None if whole text is visible
     _wrapped_texts : wrapped texts objects of the given long text
     """
+    __slots__ = (
+        '_text', '_color', '_size', '_position', '_font', '_length', '_wrapped_texts'
+    )
+
     def __init__(self, config=TextConfig(), wrapped_texts=None):
         if '\n' in config.text or '\r' in config.text:
             raise Exception("Please don't use newlines in text, instead use multiple texts")
@@ -52,6 +64,7 @@ class Text(Drawable):
         self._size = config.size
         self._position = config.position
         self._font = config.font
+        self._length = config.length
         self._wrapped_texts = wrapped_texts
 
     @classmethod
@@ -62,7 +75,7 @@ class Text(Drawable):
         org_conf = config.copy()
         OFFSET = 15  # line height offset
         xpos = config.position[0]
-        font = ImageFont.truetype(config.font, config.size)
+        font = get_font(config.font, config.size)
         size = font.getsize(config.text)
         lineheight = size[1]
         if xpos + size[0] > width:  # needs to be wrapped
@@ -95,19 +108,57 @@ class Text(Drawable):
         conf.size = self._size
         conf.position = self._position
         conf.font = self._font
+        conf.length = self._length
         return conf
 
     def copy(self):
-        conf = self.get_config()
-        return Text(conf)
+        new = self._shallow_copy(Text)
+        if self._wrapped_texts:
+            new._wrapped_texts = [x.copy() for x in self._wrapped_texts]
+        return new
+
+    def set_property(self, prop, value):
+        if prop == POSITION:
+            dx = value[0] - self._position[0]
+            dy = value[1] - self._position[1]
+            for x in self._wrapped_texts or []:
+                x.set_property(POSITION, (x._position[0] + dx, x._position[1] + dy))
+            self._position = value
+        elif prop == COLOR:
+            self._color = tuple(int(x) for x in value)
+            for x in self._wrapped_texts or []:
+                x.set_property(COLOR, value)
+        elif prop == ALPHA:
+            self.set_property(COLOR, (*self._color[:3], 255*value))
+        elif prop == LENGTH:
+            length = int(value)
+            self._length = length
+            if self._wrapped_texts:
+                # keep lines that fit in length, truncate the last partial line
+                wrapped = []
+                for x in self._wrapped_texts:
+                    if length <= 0:
+                        break
+                    x.set_property(LENGTH, length)
+                    wrapped.append(x)
+                    length -= len(x._text)
+                self._wrapped_texts = wrapped
+        else:
+            raise Exception("Text has no property " + prop)
 
-    def translate(self, vector, frames=1):
+    def translate(self, vector, frames=1, easing=DEFAULT_EASING):
         """
         @vector : (x, y) is translation vector
         @frames : if provided returns objects by interpolating
+        @easing : one of animator.interpolation.EASINGS
         """
-        # TODO: implement this
-        return self.copy()
+        end = (self._position[0]+vector[0], self._position[1]+vector[1])
+        if frames <= 1:
+            new = self.copy()
+            new.set_property(POSITION, end)
+            return [new]
+        positions = interpolate(self._position, end, frames, easing)
+        return InterpolatedDrawables(self, {POSITION: positions})
 
     def fade_in(self, frames=2, start_opacity=0, final_opacity=1):
         """
@@ -177,9 +228,10 @@ class Text(Drawable):
         for x in range(frames):
             curr_size += chars_per_frame
             newlen = roundfunc(curr_size)
+            # glyphs are rasterized once, each frame shows a prefix of them
             if not self._wrapped_texts:
                 conf = self.get_config()
-                conf.text = self._text[:newlen]
+                conf.length = newlen
                 text_objs.append(Text(conf))
             else:
                 wrapped_texts = []
@@ -187,7 +239,7 @@ class Text(Drawable):
                 for i, x in enumerate(self._wrapped_texts):
                     xconf = x.get_config()
                     if curr <= len(xconf.text):
-                        xconf.text =  xconf.text[:curr+1]
+                        xconf.length = curr + 1
                         wrapped_texts = self._wrapped_texts[:i]
                         wrapped_texts.append(Text(xconf))
                         break
@@ -196,31 +248,55 @@ class Text(Drawable):
                 text_objs.append(wrapped_texts)
         return text_objs
 
+    def get_layer(self, mode='RGBA'):
+        """
+        Return the text on a layer of its glyphs' size, the layer of wrapped
+        texts spans all of their lines
+        """
+        if self._wrapped_texts:
+            return self._get_wrapped_layer(mode)
+        # glyphs come from a cached mask, only its alpha is scaled per color
+        alpha = self._color[3] if len(self._color) == 4 else 255
+        run = get_glyph_run(self._text, self._font, self._size)
+        mask = run.get_mask(self._length, alpha)
+        layer = Image.new(mode, mask.size, (*self._color[:3], 0))
+        layer.putalpha(mask)
+        return layer, self._position
+
+    def _get_wrapped_layer(self, mode):
+        lines = [x.get_layer(mode) for x in self._wrapped_texts]
+        positions = [(int(x), int(y)) for _, (x, y) in lines]
+        left = min(x for x, _ in positions)
+        top = min(y for _, y in positions)
+        right = max(x + layer.size[0] for (layer, _), (x, _) in zip(lines, positions))
+        bottom = max(y + layer.size[1] for (layer, _), (_, y) in zip(lines, positions))
+        layer = Image.new(mode, (right - left, bottom - top), (0, 0, 0, 0))
+        for (line, _), (x, y) in zip(lines, positions):
+            layer.alpha_composite(line, (x - left, y - top))
+        return layer, (left, top)
+
+    def get_bounding_box(self):
+        if self._wrapped_texts:
+            boxes = [x.get_bounding_box() for x in self._wrapped_texts]
+            return (
+                min(x[0] for x in boxes), min(x[1] for x in boxes),
+                max(x[2] for x in boxes), max(x[3] for x in boxes)
+            )
+        run = get_glyph_run(self._text, self._font, self._size)
+        width, height = run.get_mask(self._length).size
+        x, y = self._position
+        return (x, y, x + width, y + height)
+
     def render_to(self, image, mode='RGBA'):
         """
-        Return Image object corresponding to the attributes.
+        Composite the text onto image, which is returned.
         """
         # NOTE: assumes mode = rgba, or alpha_composite wouldn't work
         if not self._wrapped_texts:
-            txt = Image.new(mode, image.size, (255, 255, 255, 0))
-            draw = ImageDraw.Draw(txt)
-            if self._font:
-                font = ImageFont.truetype(self._font, self._size)
-                draw.text(
-                    self._position,
-                    self._text,
-                    fill=self._color,
-                    font=font
-                )
-            else:
-                draw.text(self._position, self._text, self._color)
-            img = Image.alpha_composite(image, txt)
-            return img
-        else:
-            for x in self._wrapped_texts:
-                img = x.render_to(image)
-                image = Image.alpha_composite(image, img)
-            return image
+            return composite_layer(image, *self.get_layer(mode))
+        for x in self._wrapped_texts:
+            image = x.render_to(image, mode)
+        return image
 
 
 def _get_next_wrap_index(text, config, width, font):
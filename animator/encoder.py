@@ -0,0 +1,185 @@
+from threading import Thread
+from queue import Queue, Full
+import subprocess
+import tempfile
+import numpy
+import os
+
+DEFAULT_PIX_FMT = 'rgba'
+DEFAULT_QUEUE_SIZE = 8  # frames buffered between renderer and ffmpeg
+QUEUE_POLL_SECONDS = 0.1  # how often a blocked put checks that the writer is alive
+PIX_FMTS = {
+    # ffmpeg pixel format -> PIL mode
+    'rgba': 'RGBA',
+    'rgb24': 'RGB',
+}
+
+
+class FFmpegEncoder:
+    """
+    Streams raw frames to a long lived ffmpeg process through its stdin
+
+    Frames are queued and written by a background thread, so rendering the next
+    frame overlaps with ffmpeg encoding the previous ones. The queue is bounded,
+    so `write_frame` blocks whenever ffmpeg falls behind(backpressure).
+
+    Attributes
+    ----------
+    _path : output video path
+    _width : width of each frame
+    _height : height of each frame
+    _fps : frames per second
+    _audio_path : path of audio to be muxed, if any
+    _pix_fmt : raw pixel format written to ffmpeg, one of PIX_FMTS
+    _queue : bounded queue of frames waiting to be written
+    _threads : encoder threads, None lets ffmpeg decide
+    _process : the ffmpeg process
+    _writer : thread writing queued frames to ffmpeg
+    _error : exception raised while converting or writing a frame, if any
+    """
+    def __init__(
+            self,
+            path,
+            width,
+            height,
+            fps,
+            audio_path=None,
+            pix_fmt=DEFAULT_PIX_FMT,
+            queue_size=DEFAULT_QUEUE_SIZE,
+            threads=None
+            ):
+        if pix_fmt not in PIX_FMTS:
+            raise Exception("Unsupported pixel format, use one of " + ', '.join(PIX_FMTS))
+        self._path = path
+        self._width = width
+        self._height = height
+        self._fps = fps
+        self._audio_path = audio_path
+        self._pix_fmt = pix_fmt
+        self._queue = Queue(maxsize=queue_size)
+        self._threads = threads
+        self._process = None
+        self._writer = None
+        self._error = None
+
+    def get_command(self):
+        command = [
+            'ffmpeg', '-y',
+            '-f', 'rawvideo',
+            '-pix_fmt', self._pix_fmt,
+            '-s', '{}x{}'.format(self._width, self._height),
+            '-r', str(self._fps),
+            '-i', '-',
+        ]
+        if self._audio_path:
+            command += ['-i', self._audio_path]
+        command += [
+            '-shortest', '-crf', '20', '-b:v', '4M',
+            '-c:v', 'h264', '-pix_fmt', 'yuv420p',
+        ]
+        if self._threads:
+            command += ['-threads', str(self._threads)]
+        return command + [self._path]
+
+    def open(self):
+        self._process = subprocess.Popen(self.get_command(), stdin=subprocess.PIPE)
+        self._writer = Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+        return self
+
+    def write_frame(self, frame):
+        """
+        Queue a frame to be encoded, blocks if the queue is full
+        Parameters
+        ----------
+        frame : a pillow Image object of size (_width, _height), or an RGBA
+            uint8 array of shape (_height, _width, 4)
+        """
+        if self._process is None:
+            raise Exception("Encoder is not open. Please call open() first")
+        if self._error is not None:
+            raise Exception("ffmpeg stopped accepting frames: {}".format(self._error))
+        if isinstance(frame, numpy.ndarray):
+            # the numpy backend reuses its frame buffer for the next frame
+            frame = frame.copy()
+        if not self._put(frame):
+            raise Exception("ffmpeg writer stopped: {}".format(self._error))
+
+    def close(self):
+        """Flush the queued frames and wait for ffmpeg to finish"""
+        if self._process is None:
+            return
+        self._put(None)
+        self._writer.join()
+        self._process.stdin.close()
+        returncode = self._process.wait()
+        self._process = None
+        if self._error is not None:
+            raise Exception("ffmpeg stopped accepting frames: {}".format(self._error))
+        if returncode != 0:
+            raise Exception("ffmpeg exited with status {}".format(returncode))
+
+    def _put(self, item):
+        """Queue item, returns False if the writer is gone and it was not queued"""
+        while self._writer.is_alive():
+            try:
+                self._queue.put(item, timeout=QUEUE_POLL_SECONDS)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _write_frames(self):
+        mode = PIX_FMTS[self._pix_fmt]
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue  # drain the queue so that producers do not block
+            try:
+                if hasattr(frame, 'convert'):  # pillow image
+                    if frame.mode != mode:
+                        frame = frame.convert(mode)
+                else:  # uint8 array of shape (height, width, 4)
+                    frame = frame[:, :, :len(mode)]
+                self._process.stdin.write(frame.tobytes())
+            except Exception as e:
+                # a bad frame or a dead ffmpeg, later frames are dropped
+                self._error = e
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        try:
+            self.close()
+        except Exception:
+            # an exception raised in the with block is not replaced
+            if args[0] is None:
+                raise
+
+
+def concat_segments(paths, output, audio_path=None):
+    """
+    Losslessly concatenate video segments with the same codec parameters
+    Parameters
+    ----------
+    @paths : segment paths in order
+    @output : path of the concatenated video
+    @audio_path : if given, audio streams of this file are muxed into output
+    """
+    directory = os.path.dirname(os.path.abspath(output))
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', dir=directory, delete=False) as f:
+        for path in paths:
+            # concat demuxer list format, quotes inside paths are escaped
+            f.write("file '{}'\n".format(os.path.abspath(path).replace("'", "'\\''")))
+        list_path = f.name
+    command = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        command += ['-i', audio_path, '-map', '0:v', '-map', '1:a?', '-shortest']
+    command += ['-c', 'copy', output]
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        os.remove(list_path)
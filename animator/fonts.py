@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from threading import Lock
+
+from PIL import ImageFont
+
+DEFAULT_MAX_FONTS = 64
+DEFAULT_FONT_SIZE = 10  # same as ImageFont.truetype's default
+
+
+class FontRegistry:
+    """
+    Process wide cache of loaded truetype fonts keyed by (font path, size).
+    Least recently used fonts are evicted once max_fonts are loaded.
+
+    Attributes
+    ----------
+    _max_fonts : max number of fonts kept loaded
+    _fonts : OrderedDict of (path, size) to font, least recently used first
+    """
+    def __init__(self, max_fonts=DEFAULT_MAX_FONTS):
+        self._max_fonts = max_fonts
+        self._fonts = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, path, size=DEFAULT_FONT_SIZE):
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                return font
+        font = ImageFont.truetype(path, size)
+        with self._lock:
+            self._fonts[key] = font
+            while len(self._fonts) > self._max_fonts:
+                self._fonts.popitem(last=False)
+        return font
+
+    def preload(self, fonts):
+        """
+        Load fonts ahead of rendering
+        Parameters
+        ----------
+        @fonts : list of (path, size) tuples
+        """
+        for path, size in fonts:
+            self.get(path, size)
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+
+    def __len__(self):
+        return len(self._fonts)
+
+
+registry = FontRegistry()
+
+
+def get_font(path, size=DEFAULT_FONT_SIZE):
+    """Get a font from the process wide registry"""
+    return registry.get(path, size)
+
+
+def preload_fonts(fonts):
+    registry.preload(fonts)
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from animator.fonts import get_font
+
+DEFAULT_MAX_RUNS = 256
+
+
+class GlyphRun:
+    """
+    A string rasterized once into a compact alpha mask. Glyphs of a font may
+    reach past where their character starts(kerning, side bearings), so a
+    prefix cropped from the mask can hold pixels of the next glyph or miss
+    some of its own. The columns where a prefix differs from the crop are
+    rasterized once when it is first asked for.
+
+    Attributes
+    ----------
+    mask : 'L' mode image of the text's size with glyph coverage as values
+    offsets : x offset in the mask where each character starts,
+        offsets[i] is the width of text[:i]
+    _text : the text
+    _font : pillow font the text is drawn with
+    _patches : {length: (x, 'L' image)} columns from x on of prefixes that
+        differ from the cropped mask, None if none differ
+    """
+    def __init__(self, text, font_path, size):
+        if font_path:
+            font = get_font(font_path, size)
+        else:
+            font = ImageFont.load_default()
+        width, height = font.getsize(text)
+        self.mask = Image.new('L', (max(width, 1), max(height, 1)), 0)
+        ImageDraw.Draw(self.mask).text((0, 0), text, fill=255, font=font)
+        self.offsets = [font.getsize(text[:i])[0] for i in range(len(text) + 1)]
+        self._text = text
+        self._font = font
+        self._patches = {}
+
+    def get_mask(self, length=None, alpha=255):
+        """
+        Return mask of the first length characters with alpha(0-255) applied,
+        the same as drawing only them
+        """
+        mask = self.mask
+        if length is not None and length < len(self.offsets) - 1:
+            length = max(int(length), 0)
+            width = self.offsets[length]
+            if not width:
+                return Image.new('L', (1, mask.size[1]), 0)
+            mask = mask.crop((0, 0, width, mask.size[1]))
+            if length not in self._patches:
+                self._patches[length] = self._get_patch(length, mask)
+            patch = self._patches[length]
+            if patch is not None:
+                mask.paste(patch[1], (patch[0], 0))
+        if alpha != 255:
+            mask = mask.point(lambda x: x * alpha // 255)
+        return mask
+
+    def _get_patch(self, length, cropped):
+        """Return (x, columns from x on) of the prefix where it differs from cropped"""
+        prefix = Image.new('L', cropped.size, 0)
+        ImageDraw.Draw(prefix).text((0, 0), self._text[:length], fill=255, font=self._font)
+        box = ImageChops.difference(prefix, cropped).getbbox()
+        if box is None:
+            return None
+        return box[0], prefix.crop((box[0], 0) + prefix.size)
+
+
+@lru_cache(maxsize=DEFAULT_MAX_RUNS)
+def get_glyph_run(text, font_path, size):
+    """Get cached glyph run of the text for the font"""
+    return GlyphRun(text, font_path, size)
@@ -0,0 +1,75 @@
+import numpy
+
+DEFAULT_EASING = 'linear'
+EASINGS = {
+    # map t in [0, 1] to progress in [0, 1], work on floats and arrays alike
+    'linear': lambda t: t,
+    'ease_in': lambda t: t * t,
+    'ease_out': lambda t: t * (2 - t),
+    'ease_in_out': lambda t: t * t * (3 - 2 * t),
+}
+
+
+def ease(t, easing=DEFAULT_EASING):
+    if easing not in EASINGS:
+        raise Exception("Unknown easing, use one of " + ', '.join(EASINGS))
+    return EASINGS[easing](t)
+
+
+def interpolate(start, end, frames, easing=DEFAULT_EASING, endpoint=False):
+    """
+    Return values from start towards end for all frames in one call, as an
+    array of shape (frames, *shape of start)
+    Parameters
+    ----------
+    @start : number or tuple of numbers(position, color, ...)
+    @end : value to interpolate to
+    @frames : number of values
+    @easing : one of EASINGS
+    @endpoint : if the last value is end, otherwise values stop a step before end
+    """
+    start = numpy.asarray(start, dtype=numpy.float64)
+    end = numpy.asarray(end, dtype=numpy.float64)
+    steps = frames - 1 if endpoint else frames
+    t = numpy.arange(frames, dtype=numpy.float64) / max(steps, 1)
+    progress = ease(t, easing).reshape((frames,) + (1,) * start.ndim)
+    # every value is computed from start, so errors do not accumulate
+    return start + progress * (end - start)
+
+
+class InterpolatedDrawables:
+    """
+    Lightweight sequence view of a drawable at interpolated states. Items are
+    created only when accessed.
+
+    Attributes
+    ----------
+    _drawable : the drawable all items are copied from
+    _values : dict of property name to array of values, one row per item
+    """
+    def __init__(self, drawable, values):
+        lengths = {len(x) for x in values.values()}
+        assert len(lengths) == 1, "All properties should have the same number of values"
+        self._drawable = drawable
+        self._values = values
+        self._length = lengths.pop()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[x] for x in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("index out of range")
+        drawable = self._drawable.copy()
+        for prop, values in self._values.items():
+            value = values[index]
+            drawable.set_property(prop, tuple(value.tolist()) if value.ndim else value.item())
+        return drawable
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
@@ -0,0 +1,167 @@
+from bisect import bisect_right
+import subprocess
+import json
+import os
+
+INDEX_SUFFIX = '.index.json'
+# segments re-encoded by smart render must be concatenable with stream copied ones
+SMART_RENDER_CODECS = {('h264', 'yuv420p')}
+X264_PROFILES = {
+    # ffprobe profile name -> libx264 profile
+    'Constrained Baseline': 'baseline',
+    'Baseline': 'baseline',
+    'Main': 'main',
+    'High': 'high',
+}
+
+
+class KeyframeIndex:
+    """
+    Presentation timestamps of the frames of a video and which frames are
+    keyframes, used to seek to the keyframe before a frame and decode only
+    from there.
+
+    Attributes
+    ----------
+    pts : presentation timestamps(seconds) of frames, in presentation order
+    keyframes : sorted indices of frames that are keyframes
+    """
+    def __init__(self, pts, keyframes):
+        self.pts = pts
+        self.keyframes = keyframes
+
+    @classmethod
+    def build(cls, path):
+        """Build the index from the video's packets using ffprobe"""
+        command = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=print_section=0', path
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, check=True
+        ).stdout.decode('utf-8')
+        packets = []
+        for line in output.splitlines():
+            fields = line.split(',')
+            if len(fields) < 2 or fields[0] in ('', 'N/A'):
+                continue
+            packets.append((float(fields[0]), 'K' in fields[1]))
+        # packets are in decode order, frames are indexed in presentation order
+        packets.sort()
+        pts = [x[0] for x in packets]
+        keyframes = [i for i, x in enumerate(packets) if x[1]]
+        return cls(pts, keyframes)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the index cached next to the video, building and caching it if
+        it is missing or older than the video
+        """
+        index_path = path + INDEX_SUFFIX
+        stat = os.stat(path)
+        try:
+            with open(index_path) as f:
+                data = json.load(f)
+            if data['mtime'] == stat.st_mtime and data['size'] == stat.st_size:
+                return cls(data['pts'], data['keyframes'])
+        except (OSError, ValueError, KeyError):
+            pass
+        index = cls.build(path)
+        data = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'pts': index.pts,
+            'keyframes': index.keyframes,
+        }
+        try:
+            with open(index_path, 'w') as f:
+                json.dump(data, f)
+        except OSError:
+            pass  # e.g. read only directory, the index just isn't cached
+        return index
+
+    def __len__(self):
+        return len(self.pts)
+
+    def keyframe_before(self, frame_index):
+        """Index of the last keyframe at or before frame_index"""
+        position = bisect_right(self.keyframes, frame_index)
+        return self.keyframes[position - 1] if position else 0
+
+    def seek_time(self, frame_index):
+        """
+        Time to seek to so that decoding starts exactly at frame_index. It is
+        half a frame early so that rounding does not skip the frame.
+        """
+        if frame_index == 0 or len(self.pts) < 2:
+            return 0.
+        start = self.pts[0]
+        duration = self.pts[frame_index] - self.pts[frame_index - 1]
+        return max(self.pts[frame_index] - start - duration / 2., 0.)
+
+
+def keyframe_segments(index, spans):
+    """
+    Split frames of index at keyframes into runs of (start_frame, end_frame,
+    modified), where modified runs overlap any of spans
+    Parameters
+    ----------
+    @index : KeyframeIndex of the video
+    @spans : list of (start_frame, end_frame) that are modified, end exclusive
+    """
+    starts = sorted({0, *index.keyframes})
+    ends = starts[1:] + [len(index)]
+    segments = []
+    for start, end in zip(starts, ends):
+        modified = any(x < end and start < y for x, y in spans)
+        if segments and segments[-1][2] == modified:
+            segments[-1] = (segments[-1][0], end, modified)  # merge runs
+        else:
+            segments.append((start, end, modified))
+    return segments
+
+
+def matching_encode_options(stream):
+    """
+    libx264 output options giving the profile, level, frame rate and time
+    base of stream(see probe_stream), so that re-encoded segments can be
+    joined with segments stream copied from it. Returns None if they can't be
+    matched, then the whole video has to be re-encoded.
+    """
+    if (stream.get('codec_name'), stream.get('pix_fmt')) not in SMART_RENDER_CODECS:
+        return None
+    profile = X264_PROFILES.get(stream.get('profile'))
+    level = stream.get('level')
+    rate = stream.get('r_frame_rate', '0/0')
+    time_base = stream.get('time_base', '').split('/')
+    if profile is None or not level or level < 0:  # -99 is unknown
+        return None
+    if rate.startswith('0/') or rate.endswith('/0'):
+        return None
+    if len(time_base) != 2 or time_base[0] != '1':
+        return None
+    return {
+        '-vcodec': 'libx264',
+        '-pix_fmt': 'yuv420p',
+        '-profile:v': profile,
+        '-level': '{:g}'.format(level / 10.),  # ffprobe gives 31 for 3.1
+        '-r': rate,
+        '-video_track_timescale': time_base[1],
+    }
+
+
+def probe_stream(path):
+    """
+    Return dict of codec_name, pix_fmt, width, height, profile, level,
+    r_frame_rate and time_base of the video stream
+    """
+    command = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries',
+        'stream=codec_name,pix_fmt,width,height,profile,level,r_frame_rate,time_base',
+        '-of', 'json', path
+    ]
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(output.decode('utf-8'))['streams'][0]
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+import threading
+import json
+import time
+import os
+
+# stages of rendering a video
+SCENE = 'scene'  # computing drawables of a frame from tracks and frame slots
+RASTERIZE = 'rasterize'  # drawing a drawable, recorded per drawable class
+COMPOSITE = 'composite'  # blending layers and copying frame buffers
+ENCODE = 'encode'  # handing frames to ffmpeg, including waiting for it
+FRAME = 'frame'  # whole frame, from scene to encode
+
+
+class Span:
+    """Context manager recording the wall and cpu time of a block into a profiler"""
+    __slots__ = ('_profiler', '_stage', '_name', '_frame', '_start', '_cpu')
+
+    def __init__(self, profiler, stage, name, frame):
+        self._profiler = profiler
+        self._stage = stage
+        self._name = name
+        self._frame = frame
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *args):
+        wall = time.perf_counter() - self._start
+        cpu = time.thread_time() - self._cpu
+        self._profiler.record(self._stage, self._name, self._frame, self._start, wall, cpu)
+
+
+class Profiler:
+    """
+    Records wall and cpu time of rendering stages, per drawable class and per
+    frame. Use Animator(AnimatorConfig(profile=True)) and then read
+    animator.profiler.
+
+    Attributes
+    ----------
+    enabled : True, NullProfiler has it False
+    _records : list of (stage, name, frame, start, wall, cpu, pid, thread id)
+    """
+    enabled = True
+
+    def __init__(self):
+        self._records = []
+        self._origin = time.perf_counter()
+
+    def span(self, stage, name=None, frame=None):
+        """
+        Time a block, e.g.
+            with profiler.span(RASTERIZE, 'Circle', frame=10):
+                ...
+        """
+        return Span(self, stage, name, frame)
+
+    def record(self, stage, name, frame, start, wall, cpu):
+        self._records.append(
+            (stage, name, frame, start, wall, cpu, os.getpid(), threading.get_ident())
+        )
+
+    def pop_records(self):
+        """Return and forget the records, used to send records of worker processes"""
+        records, self._records = self._records, []
+        return records
+
+    def extend(self, records):
+        """Add records collected by another profiler, e.g. of a worker process"""
+        self._records.extend(records)
+
+    def report(self):
+        """
+        Return dict of totals by stage, by drawable class and by frame, each
+        with count, wall and cpu seconds
+        """
+        stages, drawables, frames = OrderedDict(), OrderedDict(), OrderedDict()
+        for stage, name, frame, _, wall, cpu, _, _ in self._records:
+            _add(stages, stage, wall, cpu)
+            if stage == RASTERIZE and name is not None:
+                _add(drawables, name, wall, cpu)
+            if stage == FRAME and frame is not None:
+                _add(frames, frame, wall, cpu)
+        return {
+            'stages': stages,
+            'drawables': drawables,
+            'frames': [dict(frame=k, **v) for k, v in sorted(frames.items())],
+        }
+
+    def summary(self):
+        """Text table of the report"""
+        report = self.report()
+        lines = ['{:<24} {:>8} {:>10} {:>10}'.format('', 'count', 'wall(s)', 'cpu(s)')]
+        for title, totals in (('stage', report['stages']), ('drawable', report['drawables'])):
+            for key, value in totals.items():
+                lines.append('{:<24} {:>8} {:>10.4f} {:>10.4f}'.format(
+                    '{} {}'.format(title, key), value['count'], value['wall'], value['cpu']
+                ))
+        frames = report['frames']
+        if frames:
+            walls = sorted(x['wall'] for x in frames)
+            lines.append('frames: {} mean {:.4f}s median {:.4f}s max {:.4f}s'.format(
+                len(walls), sum(walls) / len(walls), walls[len(walls) // 2], walls[-1]
+            ))
+        return '\n'.join(lines)
+
+    def save_report(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def save_trace(self, path):
+        """Save records in Chrome trace format, open it in chrome://tracing or Perfetto"""
+        events = []
+        for stage, name, frame, start, wall, cpu, pid, tid in self._records:
+            args = {'cpu_ms': cpu * 1000}
+            if frame is not None:
+                args['frame'] = frame
+            events.append({
+                'name': name or stage,
+                'cat': stage,
+                'ph': 'X',  # complete event
+                'ts': (start - self._origin) * 1e6,
+                'dur': wall * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': args,
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class NullProfiler:
+    """Profiler that records nothing, used when profiling is disabled"""
+    enabled = False
+
+    def span(self, stage, name=None, frame=None):
+        return NULL_SPAN
+
+    def record(self, *args):
+        pass
+
+    def pop_records(self):
+        return []
+
+    def extend(self, records):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def _add(totals, key, wall, cpu):
+    total = totals.setdefault(key, {'count': 0, 'wall': 0., 'cpu': 0.})
+    total['count'] += 1
+    total['wall'] += wall
+    total['cpu'] += cpu
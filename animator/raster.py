@@ -0,0 +1,562 @@
+from PIL import Image, ImageColor, ImageDraw
+import numpy
+
+# a fully opaque pixel still lets this much through, keeps log(1 - alpha) finite
+MAX_ALPHA = 1 - 1e-6
+MAX_PIXELS = 1 << 20  # pixels computed at once, bounds the memory of a batch
+PATCH_SIZE = 12  # circles narrower than this are drawn as square patches of pixels
+
+
+def draw_circles(image, centers, radii, colors):
+    """
+    Draw filled anti-aliased circles onto image in place, in one batch
+    Parameters
+    ----------
+    @image : pillow RGB or RGBA image
+    @centers : sequence of (x, y) or array of shape (N, 2), pixel centers are
+        at integer coordinates like in pillow
+    @radii : one radius for all circles, or one per circle
+    @colors : one color(tuple or pillow color name) for all circles, or one per circle
+    """
+    centers = numpy.asarray(centers, dtype=numpy.float64).reshape(-1, 2)
+    radii = numpy.broadcast_to(numpy.asarray(radii, dtype=numpy.float64), (len(centers),))
+    if not len(centers):
+        return image
+    margins = radii + 0.5  # coverage is 0 further away
+    canvas = _Canvas(image, centers - margins[:, None], centers + margins[:, None], colors)
+    if canvas.empty:
+        return image
+    # small circles are drawn as square patches, larger ones row by row. One
+    # color circles can be blended in any order, so they are split up
+    small = 2 * margins < PATCH_SIZE
+    if canvas.uniform:
+        groups = [(numpy.flatnonzero(small), True), (numpy.flatnonzero(~small), False)]
+    else:
+        groups = [(numpy.arange(len(centers)), bool(small.all()))]
+    for owner, patches in groups:
+        size = 2 * margins[owner] + 2
+        # circles are drawn in chunks of about MAX_PIXELS pixels to bound
+        # memory, rows of one color circles are drawn at their ends only
+        pixels = size * (8 if canvas.uniform and not patches else size)
+        draw = _draw_circle_patches if patches else _draw_circle_rows
+        for chunk in _chunks(pixels):
+            draw(canvas, owner[chunk], centers, margins)
+    return canvas.paste()
+
+
+def circle_layer(size, center, radius, color):
+    """
+    Return RGBA image of size with a single anti-aliased circle on a
+    transparent background, same as draw_circles() on a blank layer but
+    without blending
+    """
+    width, height = size
+    y, x = numpy.ogrid[:height, :width]
+    coverage = numpy.clip(radius + 0.5 - numpy.hypot(x - center[0], y - center[1]), 0, 1)
+    color = _colors(color, 1)[0] * 255
+    layer = numpy.empty((height, width, 4), dtype=numpy.uint8)
+    layer[..., :3] = color[:3] + 0.5
+    layer[..., 3] = coverage * color[3] + 0.5
+    return Image.fromarray(layer, 'RGBA')
+
+
+def draw_lines(image, starts, ends, colors, widths=1):
+    """
+    Draw anti-aliased line segments with round ends onto image in place.
+    Opaque lines 1 pixel wide are drawn by pillow without anti-aliasing,
+    anti-aliasing them costs many times more than drawing them.
+    Parameters
+    ----------
+    @image : pillow RGB or RGBA image
+    @starts : sequence of (x, y) where the lines start
+    @ends : sequence of (x, y) where the lines end
+    @colors : one color for all lines, or one per line
+    @widths : one width for all lines, or one per line
+    """
+    starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+    ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+    widths = numpy.broadcast_to(numpy.asarray(widths, dtype=numpy.float64), (len(starts),))
+    if not len(starts):
+        return image
+    colors = numpy.round(_colors(colors, len(starts)) * 255).astype(numpy.int64)
+    # pillow does not clip lines, so lines with ends far outside of the
+    # image are anti-aliased, which only visits the pixels in it
+    size = numpy.array(image.size, dtype=numpy.float64)
+    near = numpy.abs(numpy.hstack((starts, ends)) - numpy.tile(size / 2, 2)) <= numpy.tile(size, 2)
+    thin = (widths == 1) & (colors[:, 3] == 255) & near.all(axis=1)
+    # runs of thin and other lines are drawn one after another, in order
+    bounds = [0, *(numpy.flatnonzero(numpy.diff(thin)) + 1), len(starts)]
+    for first, last in zip(bounds, bounds[1:]):
+        lines = slice(first, last)
+        if thin[first]:
+            _draw_thin_lines(image, starts[lines], ends[lines], colors[lines])
+        else:
+            _draw_lines(image, starts[lines], ends[lines], colors[lines], widths[lines])
+    return image
+
+
+def _draw_thin_lines(image, starts, ends, colors):
+    """Draw lines 1 pixel wide with pillow, colors are RGBA arrays of 0 to 255"""
+    draw = ImageDraw.Draw(image)
+    # pillow truncates coordinates, pixel centers are at integers
+    points = numpy.floor(numpy.hstack((starts, ends)) + 0.5).tolist()
+    for xy, color in zip(points, colors.tolist()):
+        draw.line(xy, fill=tuple(color))
+
+
+def _draw_lines(image, starts, ends, colors, widths):
+    """Draw anti-aliased lines, colors are RGBA arrays of 0 to 255"""
+    margins = widths / 2 + 0.5  # coverage is 0 further away
+    canvas = _Canvas(
+        image, numpy.minimum(starts, ends) - margins[:, None],
+        numpy.maximum(starts, ends) + margins[:, None], colors
+    )
+    if canvas.empty:
+        return image
+    x_major, a, d, slope, u0, u1, half, rows = _line_bands(starts, ends, margins, canvas)
+    length = (d * d).sum(axis=1)
+    inverse_length = numpy.where(length > 0, 1 / numpy.where(length > 0, length, 1), 0)
+    # lines are drawn in chunks of about MAX_PIXELS pixels to bound memory,
+    # chunks are blended in order, so the result only differs by rounding
+    for chunk in _chunks(numpy.maximum(u1 - u0, 0) * rows):
+        step, u = _ranges(u0[chunk], u1[chunk])
+        owner = step + chunk.start
+        # the center stops at the ends, so that round ends are enumerated too
+        pu = u - a[owner, 0]
+        center = a[owner, 1] + numpy.clip(pu, 0, d[owner, 0]) * slope[owner]
+        v = numpy.ceil(center - half[owner]).astype(numpy.int64)[:, None]
+        v = v + numpy.arange(rows[chunk].max())
+        # distance from the segment, in the line's (u, v) coordinates
+        pu, pv = pu[:, None], v - a[owner, 1][:, None]
+        du, dv = d[owner, 0][:, None], d[owner, 1][:, None]
+        t = numpy.clip((pu * du + pv * dv) * inverse_length[owner][:, None], 0, 1)
+        coverage = numpy.clip(
+            margins[owner][:, None] - numpy.hypot(pu - t * du, pv - t * dv), 0, 1
+        )
+        major = x_major[owner][:, None]
+        v_low = numpy.where(major, canvas.top, canvas.left)
+        v_high = numpy.where(major, canvas.bottom, canvas.right)
+        drawn = (coverage > 0) & (v >= v_low) & (v < v_high)
+        u = numpy.broadcast_to(u[:, None], v.shape)[drawn]
+        owner, v = numpy.broadcast_to(owner[:, None], v.shape)[drawn], v[drawn]
+        major = x_major[owner]
+        canvas.draw(
+            owner, canvas.index(numpy.where(major, u, v), numpy.where(major, v, u)),
+            coverage[drawn]
+        )
+    return canvas.paste()
+
+
+def draw_polygons(image, polygons, colors):
+    """
+    Draw filled anti-aliased polygons(even-odd rule) onto image in place
+    Parameters
+    ----------
+    @image : pillow RGB or RGBA image
+    @polygons : sequence of polygons, each a sequence of (x, y) vertices
+    @colors : one color for all polygons, or one per polygon
+    """
+    polygons = [numpy.asarray(x, dtype=numpy.float64).reshape(-1, 2) for x in polygons]
+    if not polygons:
+        return image
+    low = numpy.array([x.min(axis=0) for x in polygons]) - 0.5
+    high = numpy.array([x.max(axis=0) for x in polygons]) + 0.5
+    canvas = _Canvas(image, low, high, colors)
+    if canvas.empty:
+        return image
+    for i, vertices in enumerate(polygons):
+        x0, x1 = canvas.clip_x(numpy.ceil(low[i, 0])), canvas.clip_x(numpy.floor(high[i, 0]) + 1)
+        y0, y1 = canvas.clip_y(numpy.ceil(low[i, 1])), canvas.clip_y(numpy.floor(high[i, 1]) + 1)
+        if x0 >= x1:
+            continue
+        a, b = vertices, numpy.roll(vertices, -1, axis=0)
+        # rows are taken a few at a time, pixels times edges stay about MAX_PIXELS
+        step = max(MAX_PIXELS // ((x1 - x0) * len(vertices)), 1)
+        for top in range(y0, y1, step):
+            y, x = numpy.mgrid[top:min(top + step, y1), x0:x1].reshape(2, -1)
+            px, py = x[:, None], y[:, None]
+            # even-odd rule, count edges crossed by a ray going right
+            crosses = (a[:, 1] > py) != (b[:, 1] > py)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                cross_x = a[:, 0] + (py - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+            inside = (crosses & (px < cross_x)).sum(axis=1) % 2 == 1
+            dist = _segment_distance(px, py, a, b).min(axis=1)
+            coverage = numpy.clip(numpy.where(inside, 0.5 + dist, 0.5 - dist), 0, 1)
+            canvas.draw(numpy.full(len(x), i), canvas.index(x, y), coverage)
+    return canvas.paste()
+
+
+class _Canvas:
+    """
+    Region of an image that primitives are drawn to. Primitives are drawn
+    in batches, in order, and the region is pasted back once. Only the
+    pixels that are drawn to are converted to premultiplied floats. When all
+    the primitives have one color the result does not depend on their order,
+    so only the transparency they leave at each pixel is summed up(as logs)
+    and the color is blended once when pasting.
+
+    Attributes
+    ----------
+    image : image drawn onto
+    left, top, right, bottom : region of the image that is drawn to
+    uniform : if all the primitives have the same color
+    _colors : RGBA float array of shape (N, 4), a color per primitive
+    _pixels : RGBA uint8 array of shape (pixels, 4) of the region, when not uniform
+    _buffer : premultiplied floats of the pixels drawn to, when not uniform
+    _drawn : bool array, if a pixel is in _buffer, when not uniform
+    _log_t : sum of log(1 - alpha) at each pixel, when uniform
+    _spans : differences of _log_t along rows, of spans, when uniform
+    """
+    def __init__(self, image, low, high, colors):
+        width, height = image.size
+        self.image = image
+        self.left, self.top = (
+            int(x) for x in numpy.clip(numpy.ceil(low.min(axis=0)), 0, (width, height))
+        )
+        self.right, self.bottom = (
+            int(x) for x in numpy.clip(numpy.floor(high.max(axis=0)) + 1, 0, (width, height))
+        )
+        self.empty = self.right <= self.left or self.bottom <= self.top
+        self._colors = _colors(colors, len(low))
+        self.uniform = bool((self._colors == self._colors[0]).all())
+        if self.empty:
+            return
+        size = (self.right - self.left) * (self.bottom - self.top)
+        if self.uniform:
+            self._log_t = numpy.zeros(size, dtype=numpy.float32)
+            self._spans = None
+        else:
+            region = image.crop((self.left, self.top, self.right, self.bottom))
+            self._pixels = numpy.array(region.convert('RGBA')).reshape(-1, 4)
+            # pages of the buffer are only allocated once they are written to
+            self._buffer = numpy.empty((size, 4), dtype=numpy.float32)
+            self._drawn = numpy.zeros(size, dtype=bool)
+
+    def clip_x(self, x):
+        return numpy.clip(x, self.left, self.right).astype(numpy.int32)
+
+    def clip_y(self, y):
+        return numpy.clip(y, self.top, self.bottom).astype(numpy.int32)
+
+    def index(self, x, y):
+        """Index of pixels (x, y) in the region's flat arrays"""
+        return (y - self.top) * (self.right - self.left) + (x - self.left)
+
+    def draw(self, owner, index, coverage):
+        """
+        Draw pixels at flat indices of the region covered by primitives
+        owner, pixels of a primitive must come after the ones of primitives
+        before it. owner is not needed when uniform and may be anything.
+        """
+        if self.uniform:
+            # pixels that are not covered add log(1) = 0
+            alpha = coverage.astype(numpy.float32)
+            alpha *= self._colors[0, 3]
+            numpy.clip(alpha, 0, MAX_ALPHA, out=alpha)
+            numpy.add.at(self._log_t, index, numpy.log1p(-alpha, out=alpha))
+            return
+        drawn = coverage > 0
+        if drawn.any():
+            owner = owner[drawn]
+            self._blend(index[drawn], owner, self._colors[owner, 3] * coverage[drawn])
+
+    def fill_spans(self, y, x0, x1):
+        """Cover pixels x0 <= x < x1 of rows y fully, only when uniform"""
+        width = self.right - self.left
+        log_t = numpy.float32(numpy.log1p(-min(self._colors[0, 3], MAX_ALPHA)))
+        if (x1 - x0).sum() < len(self._log_t) // 4:
+            # summing differences along rows costs a few passes over the region
+            row, x = _ranges(x0, x1)
+            numpy.add.at(self._log_t, self.index(x, y[row]), log_t)
+            return
+        if self._spans is None:
+            self._spans = numpy.zeros((self.bottom - self.top) * (width + 1), numpy.float32)
+        row = (y - self.top) * (width + 1) - self.left
+        numpy.add.at(self._spans, row + x0, log_t)
+        numpy.add.at(self._spans, row + x1, -log_t)
+
+    def paste(self):
+        """Paste the region back onto the image, returns the image"""
+        width, height = self.right - self.left, self.bottom - self.top
+        box = (self.left, self.top, self.right, self.bottom)
+        if not self.uniform:
+            drawn = numpy.flatnonzero(self._drawn)
+            buffer = self._buffer[drawn]
+            alpha = buffer[:, 3:]
+            scale = numpy.divide(255, alpha, out=numpy.zeros_like(alpha), where=alpha > 0)
+            buffer[:, :3] *= scale
+            buffer[:, 3:] *= 255
+            return self._paste_pixels(self._pixels, drawn, buffer)
+        log_t = self._log_t
+        if self._spans is not None:
+            spans = numpy.cumsum(self._spans.reshape(height, width + 1), axis=1)
+            log_t.reshape(height, width)[:] += spans[:, :-1]
+        color = numpy.append(self._colors[0, :3] * 255, 255).astype(numpy.float32)
+        if self.image.mode == 'RGBA' and self.image.getbbox() is None:
+            # over a transparent image only the color is left, the region is
+            # not read and is written whole, which is cheap without gathers
+            alpha = numpy.exp(log_t, out=log_t)
+            alpha *= -255
+            alpha += 255.5
+            # pixels are assembled as RGBA words, alpha times the word of a
+            # pixel (0, 0, 0, 1) plus the word of the color
+            words = numpy.array([color, (0, 0, 0, 1)], dtype=numpy.uint8)
+            words[0, 3] = 0
+            pixels = alpha.astype(numpy.uint32)
+            pixels *= words.view(numpy.uint32)[1]
+            pixels += words.view(numpy.uint32)[0]
+            return self._paste_pixels(pixels.view(numpy.uint8))
+        drawn = numpy.flatnonzero(log_t < 0)
+        transparency = numpy.exp(log_t[drawn])
+        pixels = numpy.array(self.image.crop(box).convert('RGBA')).reshape(-1, 4)
+        buffer = pixels.view(numpy.uint32)[drawn].view(numpy.uint8).reshape(-1, 4)
+        buffer = buffer.astype(numpy.float32)
+        # over with the color gives alpha a * t + 1 - t, of which a * t is
+        # the destination's
+        kept = transparency * buffer[:, 3] * (1 / 255)
+        alpha = kept - transparency + 1
+        numpy.divide(kept, alpha, out=kept, where=alpha > 0)
+        buffer -= color
+        buffer *= kept[:, None]
+        buffer += color
+        buffer[:, 3] = alpha * 255
+        return self._paste_pixels(pixels, drawn, buffer)
+
+    def _paste_pixels(self, pixels, drawn=None, values=None):
+        """
+        Round values(0 to 255) into RGBA pixels at indices drawn and paste
+        the pixels, pixels are pasted as they are without values
+        """
+        if values is not None:
+            values += 0.5
+            # whole pixels are scattered as 32 bit words
+            pixels.view(numpy.uint32)[drawn] = values.astype(numpy.uint8).view(numpy.uint32)
+        region = Image.fromarray(
+            pixels.reshape(self.bottom - self.top, self.right - self.left, 4), 'RGBA'
+        )
+        mode = self.image.mode
+        self.image.paste(
+            region if mode == 'RGBA' else region.convert(mode), (self.left, self.top)
+        )
+        return self.image
+
+    def _blend(self, index, owner, alpha):
+        """Blend contributions over the buffer, as if drawn one by one"""
+        flat, colors = self._buffer, self._colors
+        new = index[~self._drawn[index]]
+        flat[new] = _premultiply(self._pixels.view(numpy.uint32)[new, 0])
+        self._drawn[new] = True
+        if owner[0] != owner[-1]:
+            # only pixels covered more than once need their contributions in order
+            shared = numpy.bincount(index, minlength=len(flat))[index] > 1
+            if shared.any():
+                _blend_in_order(flat, index[shared], owner[shared], alpha[shared], colors)
+                single = ~shared
+                index, owner, alpha = index[single], owner[single], alpha[single]
+        result = flat[index] * (1 - alpha)[:, None]
+        result[:, :3] += colors[owner, :3] * alpha[:, None]
+        result[:, 3] += alpha
+        flat[index] = result
+
+
+def _chunks(counts):
+    """Slices of consecutive items whose counts add up to about MAX_PIXELS each"""
+    if not len(counts):
+        return []
+    total = numpy.cumsum(counts)
+    bounds = numpy.searchsorted(total, numpy.arange(1, total[-1] // MAX_PIXELS + 1) * MAX_PIXELS)
+    return [
+        slice(first, last) for first, last in zip([0, *bounds], [*bounds, len(counts)])
+        if first < last
+    ]
+
+
+def _ranges(starts, stops):
+    """
+    Enumerate integers starts[i] <= v < stops[i] of all the ranges, in order.
+    Returns (owner, v) arrays where owner is the index of the range
+    """
+    counts = numpy.maximum(stops - starts, 0)
+    owner = numpy.repeat(numpy.arange(len(counts), dtype=counts.dtype), counts)
+    # the running count restarts from the range's start at each range
+    offsets = numpy.cumsum(counts, dtype=counts.dtype) - counts - starts
+    return owner, numpy.arange(len(owner), dtype=counts.dtype) - offsets[owner]
+
+
+def _draw_circle_patches(canvas, owner, centers, margins):
+    """Draw circles owner as square patches of pixels around their centers"""
+    center, margin = centers[owner], margins[owner]
+    low = numpy.ceil(center - margin[:, None])
+    steps = numpy.arange(
+        int((numpy.floor(center + margin[:, None]) - low).max()) + 1, dtype=numpy.float32
+    )
+    # squared distance from the center, summed along the rows and columns,
+    # offsets from the center are small so single precision is enough
+    dx = (low[:, 0] - center[:, 0]).astype(numpy.float32)[:, None] + steps
+    dy = (low[:, 1] - center[:, 1]).astype(numpy.float32)[:, None] + steps
+    squared = (dy * dy)[:, :, None] + (dx * dx)[:, None, :]
+    margin = margin.astype(numpy.float32)
+    drawn = squared < (margin * margin)[:, None, None]
+    # indices in a region fit 32 bits, which are cheaper to compute with
+    x = low[:, 0].astype(numpy.int32)[:, None] + steps.astype(numpy.int32)
+    y = low[:, 1].astype(numpy.int32)[:, None] + steps.astype(numpy.int32)
+    if (x[:, 0].min() < canvas.left or x[:, -1].max() >= canvas.right
+            or y[:, 0].min() < canvas.top or y[:, -1].max() >= canvas.bottom):
+        drawn &= ((y >= canvas.top) & (y < canvas.bottom))[:, :, None]
+        drawn &= ((x >= canvas.left) & (x < canvas.right))[:, None, :]
+    index = canvas.index(0, y)[:, :, None] + x[:, None, :]
+    coverage = numpy.sqrt(squared, out=squared)
+    numpy.subtract(margin[:, None, None], coverage, out=coverage)
+    coverage = numpy.minimum(coverage[drawn], 1)
+    if not canvas.uniform:
+        owner = numpy.broadcast_to(owner[:, None, None], drawn.shape)[drawn]
+    canvas.draw(owner, index[drawn], coverage)
+
+
+def _draw_circle_rows(canvas, owner, centers, margins):
+    """
+    Draw circles owner row by row. When they have one color, the fully
+    covered middle of a row is drawn as a span and only its ends pixel by
+    pixel.
+    """
+    center, margin = centers[owner], margins[owner]
+    row_owner, y = _ranges(
+        canvas.clip_y(numpy.ceil(center[:, 1] - margin)),
+        canvas.clip_y(numpy.floor(center[:, 1] + margin) + 1)
+    )
+    # offsets from the centers are small so single precision is enough for
+    # them, x is split into a whole pixel and the fraction past it
+    x = numpy.floor(center[row_owner, 0])
+    fraction = (center[row_owner, 0] - x).astype(numpy.float32)
+    x = x.astype(numpy.int32)
+    dy = (y - center[row_owner, 1]).astype(numpy.float32)
+    dy *= dy
+    margin = margin[row_owner].astype(numpy.float32)
+
+    def bounds(half):
+        return (
+            canvas.clip_x(x + numpy.ceil(fraction - half).astype(numpy.int32)),
+            canvas.clip_x(x + numpy.floor(fraction + half).astype(numpy.int32) + 1)
+        )
+    x0, x1 = bounds(numpy.sqrt(numpy.maximum(margin * margin - dy, 0)))
+    if canvas.uniform:
+        # coverage is 1 up to margin - 1 from the center
+        inner = margin - 1
+        full = (dy <= inner * inner) & (inner >= 0)
+        inner0, inner1 = bounds(numpy.sqrt(numpy.maximum(inner * inner - dy, 0)))
+        inner0[~full] = inner1[~full] = x1[~full]
+        canvas.fill_spans(y, inner0, inner1)
+        # both ends of a row are taken one after another
+        pair, px = _ranges(
+            numpy.stack((x0, inner1), axis=1).ravel(), numpy.stack((inner0, x1), axis=1).ravel()
+        )
+        row = pair >> 1
+    else:
+        row, px = _ranges(x0, x1)
+        owner = owner[row_owner][row]
+    dx = (px - x[row]).astype(numpy.float32)
+    dx -= fraction[row]
+    dx *= dx
+    dx += dy[row]
+    coverage = numpy.sqrt(dx, out=dx)
+    numpy.subtract(margin[row], coverage, out=coverage)
+    canvas.draw(owner, canvas.index(0, y)[row] + px, numpy.minimum(coverage, 1, out=coverage))
+
+
+def _line_bands(starts, ends, margins, canvas):
+    """
+    Pixels near a line are enumerated as a band along its major axis(u), a
+    few pixels across(v), instead of its whole bounding box. Returns
+    (x_major, a, d, slope, u0, u1, half, rows) arrays, where a is the end of
+    the line with the lower u and d the vector to the other end in (u, v)
+    coordinates, u0 <= u < u1 are the steps of the band inside the canvas,
+    and rows are enough pixels to hold those within half of the line's v at
+    each step.
+    """
+    d = ends - starts
+    x_major = numpy.abs(d[:, 0]) >= numpy.abs(d[:, 1])
+    # swap coordinates of the other lines, so that u is their major axis
+    a = numpy.where(x_major[:, None], starts, starts[:, ::-1])
+    b = numpy.where(x_major[:, None], ends, ends[:, ::-1])
+    swap = a[:, 0] > b[:, 0]
+    a, b = numpy.where(swap[:, None], b, a), numpy.where(swap[:, None], a, b)
+    d = b - a
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        slope = numpy.nan_to_num(d[:, 1] / d[:, 0])
+    # only the part of the band inside the canvas is enumerated
+    u0 = numpy.maximum(
+        numpy.ceil(a[:, 0] - margins), numpy.where(x_major, canvas.left, canvas.top)
+    )
+    u1 = numpy.minimum(
+        numpy.floor(b[:, 0] + margins) + 1, numpy.where(x_major, canvas.right, canvas.bottom)
+    )
+    # pixels within margin of the line are this far from its center across u
+    half = margins * numpy.sqrt(1 + slope * slope)
+    rows = numpy.ceil(2 * half).astype(numpy.int64) + 1
+    return (
+        x_major, a, d, slope, u0.astype(numpy.int64), u1.astype(numpy.int64), half, rows
+    )
+
+
+def _segment_distance(x, y, a, b):
+    """Distance of points (x, y) from segments a-b, broadcasting"""
+    d = b - a
+    length = (d * d).sum(axis=-1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        t = ((x - a[..., 0]) * d[..., 0] + (y - a[..., 1]) * d[..., 1]) / length
+    t = numpy.clip(numpy.nan_to_num(t), 0, 1)  # zero length segments are points
+    return numpy.hypot(x - a[..., 0] - t * d[..., 0], y - a[..., 1] - t * d[..., 1])
+
+
+def _colors(colors, count):
+    """RGBA float array of shape (count, 4) from one color or a color per item"""
+    if isinstance(colors, numpy.ndarray):
+        colors = colors.reshape(-1, colors.shape[-1])
+    else:
+        if isinstance(colors, str) or (
+                len(colors) in (3, 4)
+                and all(numpy.isscalar(x) and not isinstance(x, str) for x in colors)):
+            colors = [colors]
+        colors = [ImageColor.getrgb(x) if isinstance(x, str) else x for x in colors]
+        # RGB and RGBA colors can be mixed
+        colors = [(*x, 255)[:4] for x in colors]
+    colors = numpy.array(colors, dtype=numpy.float64).reshape(len(colors), -1) / 255
+    if colors.shape[1] == 3:
+        colors = numpy.hstack((colors, numpy.ones((len(colors), 1))))
+    return numpy.broadcast_to(colors, (count, 4))
+
+
+def _premultiply(pixels):
+    """Premultiplied float RGBA of pixels packed as uint32 RGBA words"""
+    buffer = pixels.view(numpy.uint8).reshape(-1, 4).astype(numpy.float32)
+    buffer *= 1 / 255
+    buffer[:, :3] *= buffer[:, 3:]
+    return buffer
+
+
+def _blend_in_order(flat, index, owner, alpha, colors):
+    """
+    Blend premultiplied flat buffer with the contributions, all at once.
+    Over compositing sources one after another gives, at a pixel,
+        dst * prod(1 - a_i) + sum(src_i * prod(1 - a_j) for j > i)
+    the products are computed as sums of logs over each pixel's contributions.
+    """
+    order = numpy.argsort(index, kind='stable')  # by pixel, then owner
+    index, owner, alpha = index[order], owner[order], alpha[order]
+    starts = numpy.flatnonzero(numpy.diff(index, prepend=-1))
+    pixels = index[starts]
+    sizes = numpy.diff(numpy.append(starts, len(index)))
+
+    log_t = numpy.log1p(-numpy.minimum(alpha, MAX_ALPHA))
+    total = numpy.add.reduceat(log_t, starts)
+    # running sum that restarts at each pixel, so that it stays small and exact
+    restarted = log_t.copy()
+    restarted[starts[1:]] -= total[:-1]
+    cumulative = numpy.cumsum(restarted)
+    # transparency of the contributions drawn over each contribution
+    weight = numpy.exp(numpy.repeat(total, sizes) - cumulative) * alpha
+
+    result = flat[pixels] * numpy.exp(total)[:, None]
+    result[:, :3] += numpy.add.reduceat(colors[owner, :3] * weight[:, None], starts)
+    result[:, 3] += numpy.add.reduceat(weight, starts)
+    flat[pixels] = result
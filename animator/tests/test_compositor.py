@@ -0,0 +1,118 @@
+from PIL import Image, ImageDraw
+import numpy
+import pytest
+
+from animator.compositor import Compositor, NumpyCompositor
+from animator.elements.drawable import Drawable
+from animator.elements import Text, TextConfig
+
+
+class Square:
+    def __init__(self, position, color):
+        self.position = position
+        self.color = color
+        self.renders = 0
+
+    def render_to(self, image):
+        self.renders += 1
+        x, y = self.position
+        ImageDraw.Draw(image).rectangle((x, y, x + 4, y + 4), fill=self.color)
+        return image
+
+
+def test_static_drawables_rendered_once():
+    compositor = Compositor((20, 20), (0, 0, 0, 255))
+    static = Square((0, 0), (255, 0, 0, 255))
+    moving = [Square((x, 10), (0, 255, 0, 255)) for x in range(5)]
+    frames = [compositor.render([static, x]) for x in moving]
+
+    assert static.renders == 2  # first frame, then once into the cached layer
+    for x, frame in zip(moving, frames):
+        assert x.renders == 1
+        assert frame.getpixel((2, 2)) == (255, 0, 0, 255)
+        assert frame.getpixel((x.position[0] + 2, 12)) == (0, 255, 0, 255)
+    # frames do not leak drawables of previous frames
+    assert frames[-1].getpixel((0, 12)) == (0, 0, 0, 255)
+
+
+def test_layer_is_rebuilt_when_static_drawables_change():
+    compositor = Compositor((20, 20), (0, 0, 0, 255))
+    first = Square((0, 0), (255, 0, 0, 255))
+    second = Square((10, 10), (0, 0, 255, 255))
+    compositor.render([first])
+    compositor.render([first])
+    frame = compositor.render([second])
+    assert frame.getpixel((2, 2)) == (0, 0, 0, 255)
+    assert frame.getpixel((12, 12)) == (0, 0, 255, 255)
+
+
+def test_nested_lists_are_flattened():
+    compositor = Compositor((20, 20), (0, 0, 0, 255))
+    first = Square((0, 0), (255, 0, 0, 255))
+    second = Square((10, 10), (0, 0, 255, 255))
+    frame = compositor.render([[first, second]])
+    assert frame.getpixel((2, 2)) == (255, 0, 0, 255)
+    assert frame.getpixel((12, 12)) == (0, 0, 255, 255)
+
+
+class Overlay(Drawable):
+    def __init__(self, position, color):
+        self.position = position
+        self.color = color
+
+    def get_layer(self):
+        return Image.new('RGBA', (6, 6), self.color), self.position
+
+
+def test_numpy_compositor_matches_pil_compositor():
+    size = (20, 20)
+    pil = Compositor(size, (0, 0, 0, 255))
+    vectorized = NumpyCompositor(size, (0, 0, 0, 255))
+    static = Overlay((-2, -2), (255, 0, 0, 255))
+    for x in range(-3, 20, 4):
+        drawables = [static, Overlay((x, 8), (0, 255, 0, 128)), Square((x, 2), (0, 0, 255, 255))]
+        expected = numpy.asarray(pil.render(drawables), dtype=int)
+        observed = vectorized.render(drawables)
+        assert observed.dtype == numpy.uint8
+        assert observed.shape == (20, 20, 4)
+        assert numpy.abs(expected - observed).max() <= 1
+
+
+class BrokenOverlay(Overlay):
+    def get_layer(self):
+        return self.missing_attribute
+
+
+def test_numpy_compositor_does_not_hide_errors_in_get_layer():
+    compositor = NumpyCompositor((20, 20), (0, 0, 0, 255))
+    with pytest.raises(AttributeError):
+        compositor.render([BrokenOverlay((0, 0), (255, 0, 0, 255))])
+
+
+def test_numpy_compositor_matches_pil_compositor_for_wrapped_text():
+    # empty font is pillow's default bitmap font, no truetype file is needed
+    lines = [
+        Text(TextConfig(text, color=(255, 255, 0, 200), position=(4, 10 + 12 * i), font=''))
+        for i, text in enumerate(["wrapped", "text on", "three lines"])
+    ]
+    text = Text(TextConfig("wrapped text on three lines", position=(4, 10), font=''), lines)
+    size = (80, 60)
+    expected = numpy.asarray(Compositor(size, (0, 0, 0, 255)).render([text]), dtype=int)
+    observed = NumpyCompositor(size, (0, 0, 0, 255)).render([text])
+    rows = numpy.nonzero(expected[..., :3].any(axis=(1, 2)))[0]
+    assert rows.min() >= 10 and rows.max() >= 34  # all lines are drawn
+    assert numpy.abs(expected - observed).max() <= 1
+
+
+def test_numpy_compositor_reuses_its_frame_buffer():
+    size = (20, 20)
+    pil = Compositor(size, (0, 0, 0, 0))
+    vectorized = NumpyCompositor(size, (0, 0, 0, 0))  # transparent, frames are unpremultiplied
+    frames = []
+    for x in (0, 6):
+        drawables = [Overlay((x, 8), (0, 255, 0, 128)), Square((x, 2), (0, 0, 255, 255))]
+        expected = numpy.asarray(pil.render(drawables), dtype=int)
+        observed = vectorized.render(drawables)
+        assert numpy.abs(expected - observed).max() <= 1
+        frames.append(observed)
+    assert frames[0] is frames[1]
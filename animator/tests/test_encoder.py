@@ -0,0 +1,55 @@
+import numpy
+import pytest
+
+from animator import encoder
+from animator.encoder import FFmpegEncoder
+
+
+class FakeStdin:
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def close(self):
+        pass
+
+
+class FakeProcess:
+    """ffmpeg process whose stdin keeps what is written to it"""
+    def __init__(self, command, stdin=None):
+        self.stdin = FakeStdin()
+
+    def wait(self):
+        return 0
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    processes = []
+
+    def popen(*args, **kwargs):
+        processes.append(FakeProcess(*args, **kwargs))
+        return processes[-1]
+    monkeypatch.setattr(encoder.subprocess, 'Popen', popen)
+    return processes
+
+
+def test_bad_frame_does_not_block_producer(processes):
+    frame = numpy.zeros((2, 2, 4), dtype=numpy.uint8)
+    with pytest.raises(Exception) as error:
+        with FFmpegEncoder('out.mp4', 2, 2, 10, queue_size=2) as video:
+            video.write_frame(frame)
+            video.write_frame(object())  # fails in the writer thread
+            for _ in range(10):
+                video.write_frame(frame)
+    assert 'stopped accepting frames' in str(error.value)
+    assert processes[0].stdin.written == [frame.tobytes()]
+
+
+def test_exception_in_with_block_is_not_replaced(processes):
+    with pytest.raises(KeyError):
+        with FFmpegEncoder('out.mp4', 2, 2, 10, queue_size=2) as video:
+            video.write_frame(object())
+            raise KeyError('render failed')
@@ -0,0 +1,34 @@
+from animator import fonts
+from animator.fonts import FontRegistry
+
+
+def fake_truetype(monkeypatch):
+    loads = []
+
+    def truetype(path, size):
+        loads.append((path, size))
+        return object()
+    monkeypatch.setattr(fonts.ImageFont, 'truetype', truetype)
+    return loads
+
+
+def test_fonts_are_loaded_once(monkeypatch):
+    loads = fake_truetype(monkeypatch)
+    registry = FontRegistry()
+    font = registry.get('a.ttf', 12)
+    assert registry.get('a.ttf', 12) is font
+    assert registry.get('a.ttf', 14) is not font
+    assert loads == [('a.ttf', 12), ('a.ttf', 14)]
+
+
+def test_least_recently_used_font_is_evicted(monkeypatch):
+    loads = fake_truetype(monkeypatch)
+    registry = FontRegistry(max_fonts=2)
+    registry.preload([('a.ttf', 10), ('b.ttf', 10)])
+    registry.get('a.ttf', 10)  # b is now the least recently used
+    registry.get('c.ttf', 10)
+    assert len(registry) == 2
+    registry.get('a.ttf', 10)
+    assert loads == [('a.ttf', 10), ('b.ttf', 10), ('c.ttf', 10)]
+    registry.get('b.ttf', 10)  # evicted, so loaded again
+    assert loads[-1] == ('b.ttf', 10)
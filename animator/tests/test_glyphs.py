@@ -0,0 +1,60 @@
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+import numpy
+import pytest
+
+from animator.elements import Text, TextConfig
+from animator.glyphs import GlyphRun
+from animator.timeline import ALPHA, LENGTH
+
+# kerning and side bearings only show with a truetype font
+TRUETYPE = os.environ.get('BENCH_FONT', 'Ubuntu-R.ttf')
+TEXT = "hello world, AVAWAY Type fjord"
+
+
+def truetype_or_skip(size):
+    try:
+        return ImageFont.truetype(TRUETYPE, size)
+    except OSError:
+        pytest.skip("font {} not found, set BENCH_FONT".format(TRUETYPE))
+
+
+def draw_prefix(text, font, size, alpha=255):
+    """Mask of text drawn directly, with pillow"""
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).text((0, 0), text, fill=alpha, font=font)
+    return numpy.asarray(mask, dtype=int)
+
+
+@pytest.mark.parametrize('size', [12, 20, 31])
+def test_prefix_masks_are_the_prefix_drawn(size):
+    font = truetype_or_skip(size)
+    run = GlyphRun(TEXT, TRUETYPE, size)
+    for length in range(len(TEXT) + 1):
+        assert run.offsets[length] == font.getsize(TEXT[:length])[0]
+        mask = run.get_mask(length)
+        expected = draw_prefix(TEXT[:length], font, mask.size)
+        assert numpy.array_equal(numpy.asarray(mask, dtype=int), expected), TEXT[:length]
+
+
+def text_alpha(text):
+    layer, _ = text.get_layer()
+    return numpy.asarray(layer.getchannel('A'), dtype=int), layer.size
+
+
+def test_roll_fade_and_length_show_the_prefix():
+    font = ImageFont.load_default()
+    text = Text(TextConfig(TEXT, color=(255, 0, 0, 255), font=''))
+    for rolled in text.roll(12):
+        alpha, size = text_alpha(rolled)
+        assert numpy.array_equal(alpha, draw_prefix(TEXT[:rolled._length], font, size))
+
+    text.set_property(LENGTH, 7)
+    alpha, size = text_alpha(text)
+    assert numpy.array_equal(alpha, draw_prefix(TEXT[:7], font, size))
+
+    text.set_property(ALPHA, 0.5)
+    alpha, size = text_alpha(text)
+    # the mask is scaled by the alpha, pillow rounds where it is scaled down
+    assert numpy.abs(alpha - draw_prefix(TEXT[:7], font, size, 127)).max() <= 1
@@ -0,0 +1,47 @@
+import numpy
+
+from animator.interpolation import interpolate, InterpolatedDrawables, EASINGS
+
+
+class FakeDrawable:
+    def __init__(self):
+        self.props = {}
+
+    def copy(self):
+        new = FakeDrawable()
+        new.props = {**self.props}
+        return new
+
+    def set_property(self, prop, value):
+        self.props[prop] = value
+
+
+def test_interpolate_positions():
+    values = interpolate((0, 10), (100, 30), 4)
+    assert values.shape == (4, 2)
+    assert values.tolist() == [[0, 10], [25, 15], [50, 20], [75, 25]]
+
+    values = interpolate(0, 1, 5, endpoint=True)
+    assert values.tolist() == [0, 0.25, 0.5, 0.75, 1]
+
+
+def test_easings_start_and_end():
+    t = numpy.array([0., 1.])
+    for easing in EASINGS.values():
+        assert easing(t).tolist() == [0, 1]
+    values = interpolate(0, 1, 5, easing='ease_in', endpoint=True)
+    assert values.tolist() == [0, 0.0625, 0.25, 0.5625, 1]
+
+
+def test_interpolated_drawables():
+    drawable = FakeDrawable()
+    view = InterpolatedDrawables(drawable, {
+        'position': interpolate((0, 0), (10, 20), 10),
+        'alpha': interpolate(1, 0, 10),
+    })
+    assert len(view) == 10
+    assert view[5].props == {'position': (5, 10), 'alpha': 0.5}
+    assert view[-1].props['position'] == (9, 18)
+    assert [x.props['alpha'] for x in view[:2]] == [1, 0.9]
+    assert len(list(view)) == 10
+    assert drawable.props == {}
@@ -0,0 +1,77 @@
+import json
+
+from animator.keyframes import (
+    KeyframeIndex, INDEX_SUFFIX, keyframe_segments, matching_encode_options
+)
+
+
+def test_keyframe_before():
+    index = KeyframeIndex([x / 10. for x in range(30)], [0, 12, 24])
+    assert index.keyframe_before(0) == 0
+    assert index.keyframe_before(11) == 0
+    assert index.keyframe_before(12) == 12
+    assert index.keyframe_before(29) == 24
+
+
+def test_seek_time_is_before_frame():
+    index = KeyframeIndex([1 + x / 10. for x in range(30)], [0, 12, 24])
+    assert index.seek_time(0) == 0
+    assert abs(index.seek_time(12) - 1.15) < 1e-9
+
+
+def test_load_uses_cached_index(tmp_path, monkeypatch):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'not really a video')
+    built = []
+
+    def build(cls, path):
+        built.append(path)
+        return cls([0., 0.1, 0.2], [0])
+    monkeypatch.setattr(KeyframeIndex, 'build', classmethod(build))
+
+    index = KeyframeIndex.load(str(video))
+    assert index.pts == [0., 0.1, 0.2]
+    with open(str(video) + INDEX_SUFFIX) as f:
+        assert json.load(f)['keyframes'] == [0]
+
+    KeyframeIndex.load(str(video))
+    assert len(built) == 1  # second load is served from the cached index
+
+
+def test_segments_split_at_keyframes_around_overlays():
+    # 30 frames, keyframes every 10 frames, no ffprobe needed
+    index = KeyframeIndex([x / 10. for x in range(30)], [0, 10, 20])
+    assert keyframe_segments(index, []) == [(0, 30, False)]
+    # overlay inside the middle GOP, only that GOP is modified
+    assert keyframe_segments(index, [(12, 15)]) == [
+        (0, 10, False), (10, 20, True), (20, 30, False)
+    ]
+    # overlay ending exactly at a keyframe doesn't touch the next GOP
+    assert keyframe_segments(index, [(5, 10)]) == [(0, 10, True), (10, 30, False)]
+    # overlay crossing a keyframe modifies both GOPs, which are merged
+    assert keyframe_segments(index, [(9, 11)]) == [(0, 20, True), (20, 30, False)]
+    assert keyframe_segments(index, [(25, 26), (0, 1)]) == [
+        (0, 10, True), (10, 20, False), (20, 30, True)
+    ]
+
+
+def test_segments_start_at_first_frame_without_keyframe():
+    index = KeyframeIndex([x / 10. for x in range(20)], [5])
+    assert keyframe_segments(index, [(6, 7)]) == [(0, 5, False), (5, 20, True)]
+
+
+def test_encode_options_match_source_stream():
+    stream = {
+        'codec_name': 'h264', 'pix_fmt': 'yuv420p', 'profile': 'High',
+        'level': 31, 'r_frame_rate': '30000/1001', 'time_base': '1/30000',
+    }
+    options = matching_encode_options(stream)
+    assert options['-profile:v'] == 'high'
+    assert options['-level'] == '3.1'
+    assert options['-r'] == '30000/1001'
+    assert options['-video_track_timescale'] == '30000'
+    # anything that can't be matched means a full re-encode
+    for key, value in [
+            ('codec_name', 'hevc'), ('profile', 'High 4:4:4 Predictive'),
+            ('level', -99), ('r_frame_rate', '0/0'), ('time_base', '2/25')]:
+        assert matching_encode_options(dict(stream, **{key: value})) is None
@@ -0,0 +1,58 @@
+from PIL import Image
+import tracemalloc
+import numpy
+
+from animator.elements import Circle, CircleConfig, Particles, ParticlesConfig
+from animator.timeline import ALPHA
+from animator.raster import MAX_PIXELS
+
+
+def test_particles_render_like_circles():
+    centers = [(5, 5), (20, 8), (12, 20)]
+    colors = [(255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255)]
+    particles = Particles(ParticlesConfig(centers, radii=4, colors=colors))
+    expected = Image.new('RGBA', (30, 30), (0, 0, 0, 255))
+    for center, color in zip(centers, colors):
+        Circle(CircleConfig(center, 4, color)).render_to(expected)
+    frame = particles.render_to(Image.new('RGBA', (30, 30), (0, 0, 0, 255)))
+    assert frame.tobytes() == expected.tobytes()
+
+
+def test_particle_views_write_to_arrays():
+    particles = Particles(ParticlesConfig([(0, 0), (10, 10)], position=(5, 5)))
+    view = particles[1]
+    assert isinstance(view, Circle)
+    assert view._center == (15, 15)
+    view.set_property(ALPHA, 0.)
+    view._center = (25, 5)
+    assert particles._colors[1].tolist()[3] == 0
+    assert particles._centers[1].tolist() == [20, 0]
+
+    circle = view.copy()
+    assert type(circle) is Circle
+    circle._radius = 1
+    assert particles._radii.tolist() == [20, 20]
+
+
+def test_particles_translate_moves_all():
+    particles = Particles(ParticlesConfig([(0, 0), (10, 10)], radii=[1, 2]))
+    frames = particles.translate((10, 0), frames=5)
+    assert len(frames) == 5
+    assert frames[2].get_bounding_box() == (3, -1, 16, 12)
+    assert particles.get_bounding_box() == (-1, -1, 12, 12)
+
+
+def test_layer_memory_is_bounded():
+    # 100k particles cover millions of pixels, drawing them all at once
+    # would take hundreds of MB of temporaries
+    centers = numpy.random.RandomState(0).rand(100000, 2) * (1920, 1080)
+    particles = Particles(ParticlesConfig(centers, radii=3, colors=(255, 255, 255, 180)))
+    tracemalloc.start()
+    try:
+        layer, _ = particles.get_layer()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    width, height = layer.size
+    # a few arrays of the layer's size, a chunk's pixels and the particles' arrays
+    assert peak < width * height * 8 + MAX_PIXELS * 16 + len(particles) * 128
@@ -0,0 +1,45 @@
+import json
+
+from animator.animator import Animator, AnimatorConfig
+from animator.elements import Circle, CircleConfig
+from animator.profiling import NullProfiler
+
+
+def new_animator(**kwargs):
+    animator = Animator(AnimatorConfig(width=40, height=30, fps=5, duration=1, **kwargs))
+    circle = Circle(CircleConfig((10, 10), 5))
+    animator.add_frames_objects(0, circle.translate((20, 0), frames=5))
+    return animator
+
+
+def test_report_by_stage_drawable_and_frame(tmp_path):
+    animator = new_animator(profile=True)
+    list(animator.compile_frames())
+    report = animator.profiler.report()
+    assert set(report['stages']) == {'frame', 'scene', 'rasterize', 'composite'}
+    assert report['drawables']['Circle']['count'] == 5
+    assert [x['frame'] for x in report['frames']] == [0, 1, 2, 3, 4]
+    assert all(x['wall'] >= 0 and x['cpu'] >= 0 for x in report['frames'])
+    assert 'rasterize' in animator.profiler.summary()
+
+    path = tmp_path / 'trace.json'
+    animator.profiler.save_trace(str(path))
+    events = json.loads(path.read_text())['traceEvents']
+    assert {x['ph'] for x in events} == {'X'}
+    assert sum(x['name'] == 'Circle' for x in events) == 5
+
+
+def test_disabled_by_default():
+    animator = new_animator(backend='numpy')
+    assert isinstance(animator.profiler, NullProfiler)
+    list(animator.compile_frames())
+    assert animator.profiler.pop_records() == []
+
+
+def test_serial_and_parallel_compiles_are_counted_once():
+    animator = new_animator(profile=True)
+    list(animator.compile_frames())
+    list(animator.compile_frames(workers=2))
+    report = animator.profiler.report()
+    assert report['stages']['frame']['count'] == 10
+    assert report['drawables']['Circle']['count'] == 10
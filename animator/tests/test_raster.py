@@ -0,0 +1,56 @@
+from PIL import Image, ImageDraw
+import numpy
+
+from animator.raster import draw_circles, draw_lines, draw_polygons
+
+
+def test_batch_blends_like_drawing_one_by_one():
+    random = numpy.random.RandomState(0)
+    centers = random.rand(40, 2) * 30
+    colors = (random.rand(40, 4) * 255).astype(numpy.uint8)
+    batch = draw_circles(Image.new('RGBA', (30, 30), (0, 0, 0, 255)), centers, 3, colors)
+    single = Image.new('RGBA', (30, 30), (0, 0, 0, 255))
+    for center, color in zip(centers, colors):
+        draw_circles(single, [center], 3, tuple(color))
+    diff = numpy.asarray(batch, dtype=int) - numpy.asarray(single, dtype=int)
+    assert numpy.abs(diff).max() <= 1  # single ones are rounded to uint8 each time
+
+
+def test_edges_are_anti_aliased():
+    image = draw_circles(Image.new('L', (20, 20)), [(10, 10)], 5, 'white')
+    row = numpy.asarray(image)[10]
+    assert row[10] == 255 and row[4] == 0
+    assert row[5] == 128  # on the circle, half covered
+
+    image = draw_lines(Image.new('RGB', (20, 10)), [(2, 5)], [(17, 5)], 'white')
+    assert numpy.asarray(image)[4:7, 10, 0].tolist() == [0, 255, 0]
+    image = draw_lines(Image.new('RGB', (20, 10)), [(2, 5)], [(17, 5)], 'white', 2)
+    assert numpy.asarray(image)[3:8, 10, 0].tolist() == [0, 128, 255, 128, 0]
+
+    image = draw_polygons(Image.new('RGB', (20, 20)), [[(2, 2), (17, 2), (17, 17)]], 'white')
+    pixels = numpy.asarray(image)[..., 0]
+    assert pixels[5, 15] == 255 and pixels[15, 5] == 0
+    assert pixels[2, 10] == 128  # on the edge
+
+
+def test_color_names_per_item():
+    starts, ends = [(2, 2), (2, 5), (2, 8)], [(17, 2), (17, 5), (17, 8)]
+    image = draw_lines(Image.new('RGB', (20, 10)), starts, ends, ['red', 'lime', 'blue'])
+    pixels = numpy.asarray(image)[[2, 5, 8], 10].tolist()
+    assert pixels == [[255, 0, 0], [0, 255, 0], [0, 0, 255]]
+
+
+def test_thin_opaque_lines_are_drawn_by_pillow():
+    random = numpy.random.RandomState(0)
+    starts, ends = random.rand(50, 2) * 40, random.rand(50, 2) * 40
+    colors = [(255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 100)] * 16 + ['red', 'white']
+    image = draw_lines(Image.new('RGB', (40, 40)), starts, ends, colors)
+    expected = Image.new('RGB', (40, 40))
+    for start, end, color in zip(starts, ends, colors):
+        if color == (0, 0, 255, 100):
+            draw_lines(expected, [start], [end], color)  # anti-aliased, in order
+        else:
+            ImageDraw.Draw(expected).line(
+                numpy.floor(numpy.append(start, end) + 0.5).tolist(), fill=color
+            )
+    assert numpy.array_equal(numpy.asarray(image), numpy.asarray(expected))
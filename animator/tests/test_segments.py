@@ -0,0 +1,63 @@
+import numpy
+
+from animator import animator as animator_module
+from animator.animator import Animator, AnimatorConfig
+from animator.elements import Circle, CircleConfig
+from animator.timeline import Interpolator, POSITION
+
+
+class FakeEncoder:
+    """Saves frames as a numpy file instead of running ffmpeg"""
+    def __init__(self, path):
+        self.path = path
+        self.frames = []
+
+    def write_frame(self, frame):
+        self.frames.append(numpy.array(frame))
+
+    def close(self):
+        if self.frames:
+            numpy.save(self.path, numpy.stack(self.frames), allow_pickle=False)
+            self.frames = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def fake_concat(paths, output, audio_path=None):
+    numpy.save(output, numpy.concatenate([numpy.load(x + '.npy') for x in paths]))
+
+
+def new_animator():
+    animator = Animator(AnimatorConfig(width=40, height=30, fps=10, duration=3))
+    circle = Circle(CircleConfig((5, 5), 4))
+    animator.add_track(circle, 0, 9, [Interpolator(POSITION, (0, 0), (30, 20))])
+    animator.add_track(Circle(CircleConfig((20, 15), 6)), 9, 22)
+    animator.add_track(circle, 22, 30, [Interpolator(POSITION, (30, 0), (0, 20))])
+    return animator
+
+
+def test_boundaries_snap_to_track_edges():
+    animator = new_animator()
+    # even split would be at 10 and 20, tracks start and end at 9 and 22
+    assert animator.get_segment_boundaries(3) == [0, 9, 22, 30]
+    # edges further than the snap distance are not used
+    assert animator.get_segment_boundaries(6) == [0, 5, 9, 15, 20, 25, 30]
+
+
+def test_segments_encode_the_same_frames_as_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        Animator, 'new_encoder',
+        lambda self, path, audio_path=None, threads=None: FakeEncoder(path)
+    )
+    monkeypatch.setattr(animator_module, 'concat_segments', fake_concat)
+    animator = new_animator()
+    animator.convert_to_video(str(tmp_path / 'serial.mp4'))
+    animator.convert_to_video(str(tmp_path / 'parallel.mp4'), segments=3)
+    serial = numpy.load(str(tmp_path / 'serial.mp4.npy'))
+    parallel = numpy.load(str(tmp_path / 'parallel.mp4.npy'))
+    assert serial.shape == (30, 30, 40, 4)
+    assert numpy.array_equal(serial, parallel)
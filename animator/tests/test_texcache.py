@@ -0,0 +1,80 @@
+import os
+
+from PIL import Image
+import pytest
+
+from animator import texcache
+from animator.texcache import TEXCache
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Fake tex2im, returns list of rendered (formula, color, dpi)"""
+    calls = []
+
+    def render(formula, color, dpi):
+        calls.append((formula, tuple(color), dpi))
+        return Image.new('RGBA', (10 * len(formula), 10), (*color[:3], 255))
+    monkeypatch.setattr(texcache, '_render', render)
+    return calls
+
+
+def test_path_is_keyed_by_formula_color_and_dpi(tmp_path):
+    cache = TEXCache(str(tmp_path))
+    path = cache.get_path('x^2', (255, 0, 0), 150)
+    assert path == cache.get_path('x^2', [255, 0, 0], 150)
+    assert path.endswith(texcache.ENTRY_SUFFIX)
+    assert len({
+        path,
+        cache.get_path('x^3', (255, 0, 0), 150),
+        cache.get_path('x^2', (0, 255, 0), 150),
+        cache.get_path('x^2', (255, 0, 0), 300),
+    }) == 4
+
+
+def test_renders_once_then_hits(tmp_path, renders):
+    cache = TEXCache(str(tmp_path))
+    first = cache.get_image('x^2', (255, 0, 0))
+    second = cache.get_image('x^2', (255, 0, 0))
+    assert renders == [('x^2', (255, 0, 0), texcache.DEFAULT_DPI)]
+    assert first.tobytes() == second.tobytes()
+    assert [x.suffix for x in tmp_path.iterdir()] == [texcache.ENTRY_SUFFIX]
+
+
+def test_prerender_renders_each_formula_once(tmp_path, renders):
+    cache = TEXCache(str(tmp_path))
+    cache.get_image('b', (0, 0, 255), 150)
+    # colors as lists, as read from json
+    cache.prerender([('a', [255, 0, 0], 150), ('a', (255, 0, 0), 150), ('b', [0, 0, 255], 150)])
+    assert sorted(renders) == [('a', (255, 0, 0), 150), ('b', (0, 0, 255), 150)]
+
+
+def test_least_recently_used_renders_are_evicted(tmp_path, renders):
+    cache = TEXCache(str(tmp_path))
+    cache.get_image('a', (0, 0, 0))
+    cache.get_image('b', (0, 0, 0))
+    size = os.path.getsize(cache.get_path('a', (0, 0, 0), texcache.DEFAULT_DPI))
+    os.utime(cache.get_path('a', (0, 0, 0), texcache.DEFAULT_DPI), (0, 0))
+    os.utime(cache.get_path('b', (0, 0, 0), texcache.DEFAULT_DPI), (1, 1))
+    cache.get_image('a', (0, 0, 0))  # read, so b is now the least recently used
+
+    cache._max_bytes = size * 2
+    # a writer's temporary file is not an entry, it is left alone
+    (tmp_path / ('writing' + texcache.TEMP_SUFFIX)).write_bytes(b'0' * size * 4)
+    cache.get_image('c', (0, 0, 0))
+    names = {x.name for x in tmp_path.iterdir()}
+    assert os.path.basename(cache.get_path('b', (0, 0, 0), texcache.DEFAULT_DPI)) not in names
+    assert os.path.basename(cache.get_path('a', (0, 0, 0), texcache.DEFAULT_DPI)) in names
+    assert 'writing' + texcache.TEMP_SUFFIX in names
+
+
+def test_temporary_file_is_removed_when_save_fails(tmp_path, monkeypatch):
+    cache = TEXCache(str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    image = Image.new('RGBA', (5, 5))
+    monkeypatch.setattr(image, 'save', fail)
+    with pytest.raises(OSError):
+        cache._store(image, cache.get_path('x', (0, 0, 0), 150))
+    assert list(tmp_path.iterdir()) == []
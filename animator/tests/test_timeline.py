@@ -0,0 +1,55 @@
+from animator.timeline import Interpolator, Track, Timeline, POSITION, ALPHA
+
+
+class FakeDrawable:
+    def __init__(self):
+        self.props = {}
+
+    def copy(self):
+        new = FakeDrawable()
+        new.props = {**self.props}
+        return new
+
+    def set_property(self, prop, value):
+        self.props[prop] = value
+
+
+def test_interpolator_value_at():
+    interpolator = Interpolator(POSITION, (0, 10), (100, 30))
+    assert interpolator.value_at(0) == (0, 10)
+    assert interpolator.value_at(0.5) == (50, 20)
+    assert interpolator.value_at(1) == (100, 30)
+
+    interpolator = Interpolator(ALPHA, 0, 1)
+    assert interpolator.value_at(0.25) == 0.25
+
+
+class TestTrack:
+    def test_static_track_is_not_copied(self):
+        drawable = FakeDrawable()
+        track = Track(drawable, 5, 10)
+        assert not track.is_active(4)
+        assert track.is_active(5)
+        assert track.is_active(9)
+        assert not track.is_active(10)
+        assert track.drawable_at(7) is drawable
+
+    def test_interpolated_track(self):
+        drawable = FakeDrawable()
+        track = Track(drawable, 10, 15, [Interpolator(ALPHA, 0, 1)])
+        assert track.drawable_at(10).props[ALPHA] == 0
+        assert track.drawable_at(12).props[ALPHA] == 0.5
+        # last frame reaches the end value
+        assert track.drawable_at(14).props[ALPHA] == 1
+        assert drawable.props == {}
+
+
+def test_timeline_drawables_at():
+    first, second = FakeDrawable(), FakeDrawable()
+    timeline = Timeline()
+    timeline.add_track(Track(first, 0, 10))
+    timeline.add_track(Track(second, 5, 20))
+    assert timeline.drawables_at(0) == [first]
+    assert timeline.drawables_at(5) == [first, second]
+    assert timeline.drawables_at(15) == [second]
+    assert timeline.drawables_at(20) == []
@@ -0,0 +1,35 @@
+import numpy
+import pytest
+
+skvideo_io = pytest.importorskip('skvideo.io')
+
+from animator.keyframes import KeyframeIndex  # noqa: E402
+from animator.video import Video  # noqa: E402
+
+
+class FakeReader:
+    """Reader decoding `count` black frames"""
+    inputfps = 10
+
+    def __init__(self, count):
+        self.count = count
+
+    def getShape(self):
+        return (self.count, 4, 4, 3)
+
+    def nextFrame(self):
+        for _ in range(self.count):
+            yield numpy.zeros((4, 4, 3), dtype=numpy.uint8)
+
+    def close(self):
+        pass
+
+
+def test_short_decode_raises_index_error(monkeypatch):
+    video = Video(FakeReader(10), path='video.mp4')
+    video._index = KeyframeIndex([x / 10. for x in range(10)], [0, 5])
+    # the decoder stops 2 frames short of frame 8
+    monkeypatch.setattr(skvideo_io, 'FFmpegReader', lambda *args, **kwargs: FakeReader(2))
+    with pytest.raises(IndexError) as error:
+        video.get_frame(8)
+    assert 'frame 8' in str(error.value) and '2 of 4' in str(error.value)
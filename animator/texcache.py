@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import tempfile
+import hashlib
+import os
+
+from PIL import Image
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'ANIMATOR_TEX_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'animator', 'tex')
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_DPI = 150  # same as tex2im's default resolution
+ENTRY_SUFFIX = '.png'
+TEMP_SUFFIX = '.tmp'  # files being written, never evicted
+
+
+class TEXCache:
+    """
+    Content addressed disk cache of rendered LaTeX formulas
+
+    Renders are keyed by formula, color and dpi. Files are touched whenever
+    they are read, and least recently used ones are removed once the cache
+    grows beyond max_bytes.
+
+    Attributes
+    ----------
+    _directory : directory where rendered images are kept
+    _max_bytes : max total size of the cached images
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self._directory = directory
+        self._max_bytes = max_bytes
+
+    def get_path(self, formula, color, dpi):
+        key = repr((formula, tuple(color), dpi)).encode('utf-8')
+        return os.path.join(self._directory, hashlib.sha256(key).hexdigest() + ENTRY_SUFFIX)
+
+    def get_image(self, formula, color, dpi=DEFAULT_DPI):
+        """Return rendered formula as RGBA image, rendering it on a cache miss"""
+        path = self.get_path(formula, color, dpi)
+        if os.path.exists(path):
+            os.utime(path)  # mark as recently used
+            with Image.open(path) as img:
+                return img.convert('RGBA')
+        img = _render(formula, color, dpi)
+        self._store(img, path)
+        return img
+
+    def prerender(self, formulas, workers=None):
+        """
+        Render formulas not in cache yet, using a pool of workers
+        Parameters
+        ----------
+        @formulas : list of (formula, color, dpi) tuples
+        @workers : number of concurrent LaTeX runs, defaults to number of cpus
+        """
+        # colors may be lists, which can not be in a set
+        formulas = {(formula, tuple(color), dpi) for formula, color, dpi in formulas}
+        missing = {
+            x for x in formulas if not os.path.exists(self.get_path(*x))
+        }
+        # LaTeX runs in subprocesses, so threads are enough to keep cpus busy
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            list(executor.map(lambda x: self.get_image(*x), missing))
+
+    def evict(self):
+        """Remove least recently used images until cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self._directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue  # e.g. temporary file of a writer
+            path = os.path.join(self._directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(x[1] for x in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _store(self, img, path):
+        os.makedirs(self._directory, exist_ok=True)
+        # write to a temporary file first, so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(suffix=TEMP_SUFFIX, dir=self._directory)
+        os.close(fd)
+        try:
+            img.save(tmp_path, format='PNG')
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)  # save failed
+        self.evict()
+
+
+def _render(formula, color, dpi):
+    """
+    Render formula with tex2im in an isolated directory and tint it with color
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        command = [
+            'tex2im', '-b', 'transparent', '-t', 'black',
+            '-r', '{0}x{0}'.format(dpi), formula
+        ]
+        # tex2im writes to out.png in the current directory
+        subprocess.run(command, cwd=directory, check=True)
+        with Image.open(os.path.join(directory, 'out.png')) as rendered:
+            mask = rendered.convert('RGBA').getchannel('A')
+    img = Image.new('RGBA', mask.size, (*color[:3], 0))
+    img.putalpha(mask)
+    return img
+
+
+cache = TEXCache()
+
+
+def get_image(formula, color, dpi=DEFAULT_DPI):
+    return cache.get_image(formula, color, dpi)
+
+
+def prerender(configs, workers=None):
+    """Render formulas of TEXConfig objects into the cache ahead of time"""
+    cache.prerender([(x.formula, x.color, x.dpi) for x in configs], workers)
@@ -0,0 +1,95 @@
+from animator.interpolation import ease, DEFAULT_EASING
+
+POSITION = 'position'
+ALPHA = 'alpha'
+COLOR = 'color'
+RADIUS = 'radius'
+LENGTH = 'length'  # number of visible characters of a text
+
+
+class Interpolator:
+    """
+    Interpolates a property of a drawable over a track
+
+    Attributes
+    ----------
+    prop : name of the property, set via Drawable.set_property()
+    start : value at the first frame of the track, a number or tuple of numbers
+    end : value at the last frame of the track
+    easing : one of animator.interpolation.EASINGS
+    """
+    def __init__(self, prop, start, end, easing=DEFAULT_EASING):
+        self.prop = prop
+        self.start = start
+        self.end = end
+        self.easing = easing
+
+    def value_at(self, t):
+        """Value at t, where t goes from 0(first frame) to 1(last frame)"""
+        t = ease(t, self.easing)
+        if isinstance(self.start, tuple):
+            return tuple(a + (b - a) * t for a, b in zip(self.start, self.end))
+        return self.start + (self.end - self.start) * t
+
+
+class Track:
+    """
+    A drawable shown from start_frame up to(not including) end_frame. The
+    drawable is stored once, its per frame state is computed from the
+    interpolators only when the frame is rendered.
+
+    Attributes
+    ----------
+    drawable : the drawable object
+    start_frame : first frame of the track
+    end_frame : frame at which the track ends, exclusive
+    interpolators : list of Interpolator objects
+    """
+    def __init__(self, drawable, start_frame, end_frame, interpolators=()):
+        assert start_frame >= 0, "No negative indexing"
+        assert end_frame > start_frame, "Track should span at least one frame"
+        self.drawable = drawable
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.interpolators = list(interpolators)
+
+    def is_active(self, frame_index):
+        return self.start_frame <= frame_index < self.end_frame
+
+    def drawable_at(self, frame_index):
+        """Return the drawable with its state at the given frame"""
+        if not self.interpolators:
+            return self.drawable  # static, no need to copy
+        span = self.end_frame - self.start_frame - 1
+        t = (frame_index - self.start_frame) / float(span) if span else 1.
+        drawable = self.drawable.copy()
+        for interpolator in self.interpolators:
+            drawable.set_property(interpolator.prop, interpolator.value_at(t))
+        return drawable
+
+
+class Timeline:
+    """
+    Collection of tracks
+
+    Attributes
+    ----------
+    _tracks : list of tracks in the order they are drawn
+    """
+    def __init__(self):
+        self._tracks = []
+
+    @property
+    def tracks(self):
+        return self._tracks
+
+    def add_track(self, track):
+        self._tracks.append(track)
+        return track
+
+    def drawables_at(self, frame_index):
+        """Return drawables of active tracks at the given frame"""
+        return [
+            track.drawable_at(frame_index)
+            for track in self._tracks if track.is_active(frame_index)
+        ]
@@ -2,57 +2,233 @@ import skvideo
 import skvideo.io
 import numpy
 from PIL import Image
+from collections import OrderedDict
+import subprocess
+import tempfile
+import os
+
+from animator.keyframes import (
+    KeyframeIndex, probe_stream, keyframe_segments, matching_encode_options
+)
+from animator.encoder import concat_segments
+
+DEFAULT_CACHED_FRAMES = 32
 
 
 class Video:
     """
     Video class to manipulate video
+
+    Frames are decoded lazily, one at a time. Edits like add_text() are only
+    scheduled, they are applied to frames as the frames pass through while
+    writing the output, so memory use does not depend on the length of video.
+
+    Attributes
+    ----------
+    video : skvideo.io.FFmpegReader() object
+    path : path of the video file
+    _overlays : list of (start_frame, end_frame, drawable) to be rendered
+    _index : keyframe index of the video, loaded on first random access
+    _frame_cache : LRU OrderedDict of frame index to decoded frame
+    _max_cached_frames : max number of decoded frames kept in _frame_cache
     """
-    def __init__(self, video):
+    def __init__(self, video, path=None, max_cached_frames=DEFAULT_CACHED_FRAMES):
         """
         @video: skvideo.io.FFmpegReader() object
+        @path: path of the video, required to decode the video more than once
+        @max_cached_frames: decoded frames kept for random access
         """
         self.video = video
+        self.path = path
         self.num_frames, self.height, self.width, self.num_channels = \
             video.getShape()
-        self.frames = [
-            numpy.array(Image.fromarray(frame).convert('RGBA'))
-            for frame in video.nextFrame()
-        ]
         self.fps = video.inputfps
+        self._overlays = []
+        self._index = None
+        self._frame_cache = OrderedDict()
+        self._max_cached_frames = max_cached_frames
 
     @classmethod
     def from_file(cls, filepath):
-        return cls(skvideo.io.FFmpegReader(filepath))
+        return cls(skvideo.io.FFmpegReader(filepath), filepath)
+
+    def _open_reader(self):
+        if self.video is not None:
+            # the reader given at init can be consumed only once
+            reader, self.video = self.video, None
+            return reader
+        if self.path is None:
+            raise Exception("Video has already been read, create it with from_file() to read again")
+        return skvideo.io.FFmpegReader(self.path)
+
+    def frames(self):
+        """
+        Lazily decode frames(RGB arrays), with scheduled overlays applied
+        """
+        reader = self._open_reader()
+        try:
+            for index, frame in enumerate(reader.nextFrame()):
+                yield self._apply_overlays(index, frame)
+        finally:
+            reader.close()
+
+    def get_index(self):
+        if self._index is None:
+            if self.path is None:
+                raise Exception("Random access needs the video path, create it with from_file()")
+            self._index = KeyframeIndex.load(self.path)
+        return self._index
 
     def get_frame(self, frame_index):
-        return self.frames[frame_index]
+        """
+        Return RGBA array of the frame at frame_index. Decoding starts from the
+        keyframe before the frame, and decoded frames are kept in an LRU cache.
+        """
+        frame = self._get_decoded_frame(frame_index)
+        frame = self._apply_overlays(frame_index, frame)
+        return numpy.array(Image.fromarray(frame).convert('RGBA'))
+
+    def _get_decoded_frame(self, frame_index):
+        if frame_index in self._frame_cache:
+            self._frame_cache.move_to_end(frame_index)
+            return self._frame_cache[frame_index]
+        index = self.get_index()
+        if not 0 <= frame_index < len(index):
+            raise IndexError("frame index out of range")
+        # decoding can only start at a keyframe, decode forward from there and
+        # keep the frames in between, they are likely to be asked for next
+        start = index.keyframe_before(frame_index)
+        reader = skvideo.io.FFmpegReader(
+            self.path,
+            inputdict={'-ss': '{:.6f}'.format(index.seek_time(start))},
+            outputdict={'-vframes': str(frame_index - start + 1)}
+        )
+        decoded = 0
+        try:
+            for i, frame in enumerate(reader.nextFrame()):
+                self._cache_frame(start + i, frame)
+                decoded += 1
+        finally:
+            reader.close()
+        if frame_index not in self._frame_cache:
+            # e.g. the index counts more frames than the decoder returns
+            raise IndexError(
+                "frame {} requested but decoding from keyframe {} returned {} of {} "
+                "frames, the index has {} frames".format(
+                    frame_index, start, decoded, frame_index - start + 1, len(index)
+                )
+            )
+        return self._frame_cache[frame_index]
+
+    def _cache_frame(self, frame_index, frame):
+        self._frame_cache[frame_index] = frame
+        self._frame_cache.move_to_end(frame_index)
+        while len(self._frame_cache) > self._max_cached_frames:
+            self._frame_cache.popitem(last=False)
 
     def add_text(self, text=None, start_frame=0, num_frames=10):
-        frames = self.frames[start_frame:start_frame+num_frames]
-        newframes = []
-        for frame in frames:
-            img = Image.fromarray(frame, 'RGBA')
-            newimg = text.render_to(img)
-            newframes.append(numpy.array(newimg))
-        self.frames = self.frames[:start_frame] +\
-            newframes + self.frames[start_frame+num_frames:]
-
-    def write_output_video(self, path):
-        vid_out = skvideo.io.FFmpegWriter(
+        """Render text on num_frames frames from start_frame"""
+        self._overlays.append((start_frame, start_frame + num_frames, text))
+
+    def _apply_overlays(self, index, frame):
+        drawables = [
+            drawable for start, end, drawable in self._overlays
+            if start <= index < end
+        ]
+        if not drawables:
+            return frame
+        img = Image.fromarray(frame).convert('RGBA')
+        for drawable in drawables:
+            img = drawable.render_to(img)
+        return numpy.asarray(img.convert('RGB'))
+
+    def write_output_video(self, path, smart=False):
+        """
+        Decode, apply overlays and encode frames in a single pass
+        Parameters
+        ----------
+        @path : output video path
+        @smart : only re-encode the keyframe aligned segments that have
+            overlays, the rest are stream copied. Needs an h264 yuv420p source
+            whose profile, level and timing libx264 can match(see
+            keyframes.matching_encode_options), otherwise the whole video is
+            re-encoded.
+        """
+        if smart and self.path is not None:
+            options = matching_encode_options(probe_stream(self.path))
+            if options is not None:
+                segments = self.get_segments()
+                if len(segments) > 1:
+                    return self._smart_render(path, segments, options)
+                if not segments[0][2]:  # nothing to re-encode
+                    command = ['ffmpeg', '-y', '-i', self.path, '-c', 'copy', path]
+                    subprocess.run(command, check=True)
+                    return
+        vid_out = self._new_writer(path)
+        for frame in self.frames():
+            vid_out.writeFrame(frame)
+        vid_out.close()
+
+    def _new_writer(self, path, options=None):
+        """
+        Writer encoding to path, options are output options of the encoder,
+        e.g. from matching_encode_options()
+        """
+        outputdict = options or {
+            '-vcodec': 'libx264',
+            '-pix_fmt': 'yuv420p',
+            '-r': str(self.fps),
+        }
+        return skvideo.io.FFmpegWriter(
             path,
             inputdict={
-                '-r': str(self.fps),
+                '-r': outputdict['-r'],
             },
-            outputdict={
-                '-vcodec': 'libx264',
-                '-pix_fmt': 'yuv420p',
-                '-r': str(self.fps),
-            }
+            outputdict=outputdict
         )
-        for frame in self.frames:
-            vid_out.writeFrame(frame)
-        vid_out.close()
+
+    def get_segments(self):
+        """
+        Split the video at keyframes into runs of (start_frame, end_frame,
+        modified), where modified runs have frames with overlays
+        """
+        return keyframe_segments(self.get_index(), [(x, y) for x, y, _ in self._overlays])
+
+    def _smart_render(self, path, segments, options):
+        with tempfile.TemporaryDirectory() as directory:
+            pattern = os.path.join(directory, 'segment%05d.mp4')
+            # stream copy the whole video split at run boundaries, in one pass
+            boundaries = ','.join(str(x[0]) for x in segments[1:])
+            command = [
+                'ffmpeg', '-y', '-i', self.path, '-map', '0:v:0', '-c', 'copy',
+                '-f', 'segment', '-segment_frames', boundaries,
+                '-reset_timestamps', '1', pattern
+            ]
+            subprocess.run(command, check=True)
+            # then replace the copied runs that have overlays with re-encoded ones
+            paths = []
+            for i, (start, end, modified) in enumerate(segments):
+                segment_path = pattern % i
+                if modified:
+                    self._encode_frames(segment_path, start, end, options)
+                paths.append(segment_path)
+            concat_segments(paths, path, audio_path=self.path)
+
+    def _encode_frames(self, path, start, end, options=None):
+        """Decode frames from start to end, apply overlays and encode them"""
+        index = self.get_index()
+        reader = skvideo.io.FFmpegReader(
+            self.path,
+            inputdict={'-ss': '{:.6f}'.format(index.seek_time(start))},
+            outputdict={'-vframes': str(end - start)}
+        )
+        vid_out = self._new_writer(path, options)
+        try:
+            for i, frame in enumerate(reader.nextFrame()):
+                vid_out.writeFrame(self._apply_overlays(start + i, frame))
+        finally:
+            reader.close()
+            vid_out.close()
 
 
 if __name__ == '__main__':
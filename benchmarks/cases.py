@@ -0,0 +1,326 @@
+"""
+Benchmark cases. A case function sets up its workload and returns
+(run, units) where run() does the measured work and units is the amount of
+work done by one run(frames, drawables, ...). Cases raise Skip when something
+they need is not available.
+"""
+from collections import OrderedDict
+import importlib
+import tempfile
+import shutil
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FONT = os.environ.get('BENCH_FONT', 'Ubuntu-R.ttf')
+FRAMES = 30
+RESOLUTIONS = OrderedDict([
+    ('480p', (640, 480)),
+    ('720p', (1280, 720)),
+    ('1080p', (1920, 1080)),
+])
+CASES = OrderedDict()  # name -> (unit, case function)
+
+
+class Skip(Exception):
+    pass
+
+
+def case(name, unit):
+    def register(function):
+        CASES[name] = (unit, function)
+        return function
+    return register
+
+
+def require_font():
+    from animator.fonts import get_font
+    try:
+        get_font(FONT, 20)
+    except OSError:
+        raise Skip("font {} not found, set BENCH_FONT".format(FONT))
+    return FONT
+
+
+def require_script_dir(directory):
+    """
+    spaces and diagrams modules import their siblings as top level modules,
+    their directories have to be on the path
+    """
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def new_animator(resolution, duration=1):
+    from animator.animator import Animator, AnimatorConfig
+    width, height = RESOLUTIONS[resolution]
+    return Animator(AnimatorConfig(width=width, height=height, fps=FRAMES, duration=duration))
+
+
+def add_circles(animator, count=200):
+    from animator.elements import Circle, CircleConfig
+    frames = animator.total_frames
+    for i in range(count):
+        center = (i * 37 % animator._width, i * 53 % animator._height)
+        circle = Circle(CircleConfig(center, 5 + i % 20, (i % 256, 128, 255 - i % 256, 200)))
+        animator.add_frames_objects(0, circle.translate((100, 50), frames=frames))
+
+
+def add_particles(animator, count=10000):
+    from animator.elements import Particles, ParticlesConfig
+    from animator.timeline import Interpolator, POSITION
+    centers = [(i * 37 % animator._width, i * 53 % animator._height) for i in range(count)]
+    particles = Particles(ParticlesConfig(centers, radii=3, colors=(255, 255, 255, 180)))
+    animator.add_track(particles, interpolators=[Interpolator(POSITION, (0, 0), (60, 30))])
+
+
+def add_texts(animator, count=20):
+    from animator.elements import Text, TextConfig
+    font = require_font()
+    frames = animator.total_frames
+    for i in range(count):
+        config = TextConfig(
+            "The quick brown fox jumps over the lazy dog {}".format(i),
+            position=(20, 20 + i * 20), font=font
+        )
+        animator.add_frames_objects(0, Text.new(config, animator._width).roll(frames))
+
+
+MIXES = OrderedDict([
+    ('circles', add_circles),
+    ('particles', add_particles),
+    ('text', add_texts),
+])
+
+
+@case('scene_build', 'drawables')
+def scene_build():
+    from animator.elements import Circle, CircleConfig
+    count = 1000
+
+    def run():
+        animator = new_animator('480p', duration=10)
+        for i in range(count):
+            circle = Circle(CircleConfig((i % 640, i % 480)))
+            animator.add_frames_objects(i % 10, circle.translate((50, 50), frames=250))
+    return run, count
+
+
+def compile_case(resolution, mix):
+    def setup():
+        animator = new_animator(resolution)
+        MIXES[mix](animator)
+
+        def run():
+            for frame in animator.compile_frames():
+                pass
+        return run, animator.total_frames
+    return setup
+
+
+for _resolution in RESOLUTIONS:
+    for _mix in MIXES:
+        case('compile_{}_{}'.format(_resolution, _mix), 'frames')(compile_case(_resolution, _mix))
+
+
+CIRCLE_BATCHES = OrderedDict([
+    ('10k_r3', (10000, 3)),
+    ('100k_r3', (100000, 3)),
+    ('10k_r20', (10000, 20)),
+])
+
+
+def circles_case(count, radius, rasterizer):
+    """
+    Translucent circles on a 1080p layer drawn in one batch, or one by one
+    by pillow's ImageDraw to compare with(not anti-aliased)
+    """
+    def setup():
+        import numpy
+        from PIL import Image, ImageDraw
+        from animator.raster import draw_circles
+        width, height = RESOLUTIONS['1080p']
+        centers = numpy.random.RandomState(0).rand(count, 2) * (width, height)
+        color = (255, 255, 255, 180)
+
+        def run_raster():
+            draw_circles(Image.new('RGBA', (width, height)), centers, radius, color)
+
+        def run_imagedraw():
+            draw = ImageDraw.Draw(Image.new('RGBA', (width, height)), 'RGBA')
+            for x, y in centers.tolist():
+                draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+        return (run_raster if rasterizer == 'raster' else run_imagedraw), count
+    return setup
+
+
+for _batch, (_count, _radius) in CIRCLE_BATCHES.items():
+    for _rasterizer in ('raster', 'imagedraw'):
+        case('{}_circles_{}'.format(_rasterizer, _batch), 'circles')(
+            circles_case(_count, _radius, _rasterizer)
+        )
+
+
+@case('text_wrap', 'texts')
+def text_wrap():
+    from animator.elements import Text, TextConfig
+    font = require_font()
+    config = TextConfig(" ".join(["wrapping"] * 60), font=font)
+    count = 5
+
+    def run():
+        for _ in range(count):
+            Text.new(config.copy(), 640)
+    return run, count
+
+
+@case('matrix_multiply', 'products')
+def matrix_multiply():
+    from utils.matrix import Matrix
+    a, b = Matrix(4, 4), Matrix(4, 4)
+    point = Matrix(4, 1)
+    count = 2000
+
+    def run():
+        for _ in range(count):
+            (a * b) * point
+    return run, count
+
+
+def import_space3d():
+    require_script_dir('spaces')
+    try:
+        return importlib.import_module('space3d')
+    except ImportError as e:
+        raise Skip(str(e))
+
+
+@case('space3d_render_scene', 'scenes')
+def space3d_render_scene():
+    space3d = import_space3d()
+    from vector3d import Vector3d, Point3d
+
+    def run():
+        projection = space3d.Projection(5, 5, 5)
+        up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+        camera = space3d.Camera(Point3d(0, 0, -50), Point3d(0, 0, 0), up, projection)
+        space = space3d.Space3d(camera, 20, 20, 20, 5)
+        space.add_axes()
+        space.add_cells()
+        space.render_scene()
+    return run, 1
+
+
+@case('space3d_grid_render', 'lines')
+def space3d_grid_render():
+    space3d = import_space3d()
+    from vector3d import Vector3d, Point3d
+    projection = space3d.Projection(5, 5, 5)
+    up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+    camera = space3d.Camera(Point3d(0, 0, -250), Point3d(0, 0, 0), up, projection)
+    # 9,603 lines on a 500x500 image
+    space = space3d.Space3d(camera, 100, 100, 100, 5)
+    space.add_axes()
+    space.add_cells()
+
+    def run():
+        space.render_scene()
+    return run, len(space.objects)
+
+
+@case('space3d_flythrough', 'frames')
+def space3d_flythrough():
+    space3d = import_space3d()
+    from vector3d import Vector3d, Point3d
+    projection = space3d.Projection(5, 2, 2)
+    up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+    camera = space3d.Camera(Point3d(2, 3, -40), Point3d(2, 3, 0), up, projection)
+    # camera is inside the grid, most of it is behind or beside the view
+    space = space3d.Space3d(camera, 40, 40, 40, 5)
+    space.add_axes()
+    space.add_cells()
+    count = 5
+
+    def run():
+        for _ in range(count):
+            space.render_scene()
+    return run, count
+
+
+@case('space2d_arrow', 'frames')
+def space2d_arrow():
+    require_script_dir('spaces')
+    from space2d import Space2d
+    from vector import Point
+    width, height = RESOLUTIONS['720p']
+    space = Space2d(width, height, width // 2, height // 2, 20)
+    animator = new_animator('720p')
+    frames = space.arrow_frames(Point.origin(), Point(10, 0), Point(-5, 12), animator.total_frames)
+    animator.add_frames_objects(0, frames)
+
+    def run():
+        for frame in animator.compile_frames():
+            pass
+    return run, animator.total_frames
+
+
+@case('space3d_camera_path', 'frames')
+def space3d_camera_path():
+    space3d = import_space3d()
+    from camera_path import CameraPath
+    from vector3d import Vector3d, Point3d
+    projection = space3d.Projection(5, 2, 2)
+    up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+    camera = space3d.Camera(Point3d(0, 0, -60), Point3d(0, 0, 0), up, projection)
+    space = space3d.Space3d(camera, 40, 40, 40, 5)
+    space.add_axes()
+    space.add_cells()
+    path = CameraPath(projection)
+    path.add_keyframe(0, (0, 0, -60), (0, 0, 0))
+    path.add_keyframe(FRAMES - 1, (30, 20, -20), (0, 0, 0), easing='ease_in_out')
+    animator = new_animator('480p')
+    animator.add_frames_objects(0, path.shots(space, animator.total_frames, position=(120, 40)))
+
+    def run():
+        for frame in animator.compile_frames():
+            pass
+    return run, animator.total_frames
+
+
+@case('diagram_parse', 'lines')
+def diagram_parse():
+    require_script_dir('diagrams')
+    from parser import parse
+    count = 500
+    # variable names can only have letters
+    names = [''.join(chr(ord('a') + int(x)) for x in str(i)) for i in range(count)]
+    lines = ['{} := "node {}"'.format(x, i) for i, x in enumerate(names)]
+    lines += [
+        '[{}] -> ({}) -> /{}/'.format(*names[i:i + 3]) for i in range(count - 2)
+    ]
+    source = '\n'.join(lines)
+
+    def run():
+        parse(source)
+    return run, len(lines)
+
+
+@case('video_encode', 'frames')
+def video_encode():
+    if shutil.which('ffmpeg') is None:
+        raise Skip("ffmpeg not found")
+    import numpy
+    from animator.encoder import FFmpegEncoder
+    width, height = RESOLUTIONS['720p']
+    frames = [
+        numpy.full((height, width, 4), i * 8, dtype=numpy.uint8) for i in range(FRAMES)
+    ]
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.mp4')
+            with FFmpegEncoder(path, width, height, FRAMES) as encoder:
+                for frame in frames:
+                    encoder.write_frame(frame)
+    return run, len(frames)
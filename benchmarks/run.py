@@ -0,0 +1,153 @@
+"""
+Run benchmarks and compare them with a baseline
+
+    python -m benchmarks.run                   # run all cases
+    python -m benchmarks.run compile_480p      # cases whose names start with it
+    python -m benchmarks.run --save-baseline   # store results as the baseline
+
+Every case runs in its own process so that peak RSS is measured per case and
+modules of one case(e.g. diagrams' utils) do not clash with another's. A case
+is flagged as a regression when its rate drops, or its peak memory grows, by
+more than the threshold compared to the baseline.
+"""
+from argparse import ArgumentParser, SUPPRESS
+import subprocess
+import tracemalloc
+import resource
+import json
+import time
+import sys
+import os
+
+from benchmarks.cases import CASES, Skip, ROOT
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2  # 20% slower or bigger than baseline is a regression
+MEMORY_SLACK_KB = 1024  # memory growth below this is noise, not a regression
+
+
+def measure(name, repeat=DEFAULT_REPEAT):
+    """Run a case in this process and return its result dict"""
+    unit, setup = CASES[name]
+    result = {'name': name, 'unit': unit}
+    try:
+        run, units = setup()
+    except Skip as e:
+        result['skipped'] = str(e)
+        return result
+    run()  # warm up caches(fonts, glyphs, ...) like a long render would
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    # tracing slows python down, so allocations are measured in a separate run
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024  # bytes on macOS, kilobytes elsewhere
+    seconds = min(times)
+    result.update({
+        'units': units,
+        'seconds': seconds,
+        'rate': units / seconds if seconds else float('inf'),
+        'peak_rss_kb': rss,
+        'peak_alloc_kb': peak // 1024,
+    })
+    return result
+
+
+def measure_in_process(name, repeat=DEFAULT_REPEAT):
+    command = [sys.executable, '-m', 'benchmarks.run', '--child', name, '--repeat', str(repeat)]
+    process = subprocess.run(
+        command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if process.returncode != 0:
+        error = process.stderr.decode('utf-8', 'replace').strip().splitlines()
+        return {'name': name, 'unit': CASES[name][0], 'error': error[-1] if error else 'failed'}
+    return json.loads(process.stdout.decode('utf-8').strip().splitlines()[-1])
+
+
+def compare(result, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return list of regression messages of result compared to baseline"""
+    if 'rate' not in result or 'rate' not in baseline:
+        return []
+    regressions = []
+    if result['rate'] < baseline['rate'] * (1 - threshold):
+        regressions.append('rate {:.1f} < baseline {:.1f} {}/s'.format(
+            result['rate'], baseline['rate'], result['unit']
+        ))
+    for key in ('peak_rss_kb', 'peak_alloc_kb'):
+        if result[key] > baseline[key] * (1 + threshold) + MEMORY_SLACK_KB:
+            regressions.append('{} {} > baseline {}'.format(key, result[key], baseline[key]))
+    return regressions
+
+
+def format_result(result):
+    if 'skipped' in result:
+        return '{:<28} skipped: {}'.format(result['name'], result['skipped'])
+    if 'error' in result:
+        return '{:<28} error: {}'.format(result['name'], result['error'])
+    return '{:<28} {:>10.1f} {:<10} rss {:>8} KB  alloc {:>8} KB'.format(
+        result['name'], result['rate'], result['unit'] + '/s',
+        result['peak_rss_kb'], result['peak_alloc_kb']
+    )
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = ArgumentParser(description="Animator benchmarks")
+    parser.add_argument('prefixes', nargs='*', help="run cases whose names start with these")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--json', help="also write results to this path")
+    parser.add_argument('--child', help=SUPPRESS)  # run one case in this process
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.repeat)))
+        return 0
+
+    names = [
+        x for x in CASES
+        if not args.prefixes or any(x.startswith(p) for p in args.prefixes)
+    ]
+    baseline = load_baseline(args.baseline)
+    results = {}
+    failed = False
+    for name in names:
+        result = measure_in_process(name, args.repeat)
+        results[name] = result
+        regressions = compare(result, baseline.get(name, {}), args.threshold)
+        print(format_result(result))
+        for message in regressions:
+            print('    REGRESSION ' + message)
+        failed = failed or bool(regressions) or 'error' in result
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        # keep baselines of cases that were not run this time
+        baseline.update({k: v for k, v in results.items() if 'rate' in v})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
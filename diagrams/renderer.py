@@ -1,33 +1,65 @@
-from PIL import ImageDraw, ImageFont, Image
+from PIL import ImageDraw, Image
+import math
+import sys
+import os
 
-import shapes
-import utils.geometry
-from graph import Graph
+# animator lives in the repository root, it is appended to the path so that
+# the scripts still run from this directory, where utils is diagrams/utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from animator.fonts import get_font  # noqa: E402
+from animator.raster import draw_lines  # noqa: E402
+
+import shapes  # noqa: E402
+from graph import Graph  # noqa: E402
 
 RENDERFONT = 'Ubuntu-R'
+LINECOLOR = 'white'
+ARC_STEP = 2  # length of segments arcs are drawn with
 
 
 def render_object(img, obj):
-    draw = ImageDraw.Draw(img)
-
+    """
+    Render obj onto img. Lines, rectangles and arcs of obj and its primitives
+    are collected and drawn anti-aliased in one batch.
+    """
+    starts, ends = [], []
+    collect_lines(img, obj, starts, ends)
+    if starts:
+        draw_lines(img, starts, ends, LINECOLOR)
+
+
+def collect_lines(img, obj, starts, ends):
+    """Collect line segments of obj into starts and ends, texts are drawn"""
     if obj.type == 'rectangle':
-        draw.rectangle((obj.top_left, obj.bottom_right))
+        (x0, y0), (x1, y1) = obj.top_left, obj.bottom_right
+        corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        starts.extend(corners)
+        ends.extend(corners[1:] + corners[:1])
 
     elif obj.type == 'text':
-        draw.text(obj.position, obj.text, font=ImageFont.truetype(obj.font))
+        ImageDraw.Draw(img).text(obj.position, obj.text, font=get_font(obj.font))
 
     elif obj.type == 'line':
-        draw.line(obj.start + obj.end)
+        starts.append(obj.start)
+        ends.append(obj.end)
 
     elif obj.type == 'arc':
-        x0, y0 = utils.add_points(obj.center, (-obj.radius, -obj.radius))
-        x1, y1 = utils.add_points(obj.center, (obj.radius, obj.radius))
-        start = utils.rad_to_deg(-obj.end)
-        end = utils.rad_to_deg(-obj.start)
-        draw.arc((x0, y0, x1, y1), start, end)
+        # approximate the arc with segments of about ARC_STEP pixels
+        steps = max(int(obj.radius * (obj.end - obj.start) / ARC_STEP), 1)
+        cx, cy = obj.center
+        points = [
+            (cx + obj.radius * math.cos(angle), cy - obj.radius * math.sin(angle))
+            for angle in (
+                obj.start + (obj.end - obj.start) * i / steps
+                for i in range(steps + 1)
+            )
+        ]
+        starts.extend(points[:-1])
+        ends.extend(points[1:])
 
     else:
-        [render_object(img, x) for x in obj.primitives]
+        [collect_lines(img, x, starts, ends) for x in obj.primitives]
 
 
 class GraphRenderer:
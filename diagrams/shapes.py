@@ -1,8 +1,14 @@
 import math
+import sys
+import os
 
-from PIL import ImageFont
+# animator lives in the repository root, it is appended to the path so that
+# the scripts still run from this directory, where utils is diagrams/utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.geometry import (
+from animator.fonts import get_font  # noqa: E402
+
+from utils.geometry import (  # noqa: E402
     add_points, scale_point,
     negate, rotate_point, distance,
     intersection_of_lines,
@@ -227,7 +233,7 @@ class TextInRectangle:
             return self._primitives
 
         # Calculate rectangle and text size
-        font = ImageFont.truetype(self.font)
+        font = get_font(self.font)
         text_size = font.getsize(self.text)
 
         if self.wrap is not None and text_size[0] > self.wrap:
@@ -317,7 +323,7 @@ class TextInParallelogram:
         # No wrap, simple Logic
 
         # Calculate text size
-        font = ImageFont.truetype(self.font)
+        font = get_font(self.font)
         text_size = font.getsize(self.text)  # equivalent to text's top left at origin  # noqa
         half_text_size = scale_point(text_size, 0.5)
         text_position = add_points(self.center, negate(half_text_size))
@@ -0,0 +1,152 @@
+from bisect import insort
+import numpy
+
+from vector3d import Vector3d, Point3d
+from space3d import Camera
+from animator.elements.drawable import Drawable
+from animator.timeline import POSITION
+from animator.interpolation import ease, DEFAULT_EASING
+
+
+class CameraKeyframe:
+    """
+    Pose of the camera at a frame
+
+    Attributes
+    ----------
+    frame : index of the frame
+    position : (x, y, z) of the camera
+    target : (x, y, z) of the point the camera faces
+    up_dir : (x, y, z) direction of up, need not be perpendicular to facing
+        direction, only its part perpendicular to it is used
+    easing : easing(animator.interpolation.EASINGS) from the previous keyframe
+    """
+    def __init__(self, frame, position, target, up_dir, easing=DEFAULT_EASING):
+        self.frame = frame
+        self.position = numpy.asarray(position, dtype=numpy.float64)
+        self.target = numpy.asarray(target, dtype=numpy.float64)
+        self.up_dir = numpy.asarray(up_dir, dtype=numpy.float64)
+        self.easing = easing
+
+    def __lt__(self, other):
+        return self.frame < other.frame
+
+
+class CameraPath:
+    """
+    Camera animated through keyframes. The pose between two keyframes is
+    interpolated, before the first and after the last keyframe the camera
+    stays still. Only the view changes per frame, the projection is shared.
+
+    Attributes
+    ----------
+    projection : Projection of the cameras
+    _keyframes : keyframes sorted by frame
+    """
+    def __init__(self, projection):
+        self.projection = projection
+        self._keyframes = []
+
+    @property
+    def keyframes(self):
+        return self._keyframes
+
+    def add_keyframe(self, frame, position, target, up_dir=(0, 1, 0), easing=DEFAULT_EASING):
+        """
+        Add the pose at frame, returns self so keyframes can be chained
+        Parameters
+        ----------
+        @frame : index of the frame
+        @position : (x, y, z) of the camera
+        @target : (x, y, z) of the point the camera faces
+        @up_dir : (x, y, z) direction of up
+        @easing : easing of the way from the previous keyframe to this one
+        """
+        if any(x.frame == frame for x in self._keyframes):
+            raise Exception("keyframe at frame {} already exists".format(frame))
+        insort(self._keyframes, CameraKeyframe(frame, position, target, up_dir, easing))
+        return self
+
+    def pose_at(self, frame):
+        """Return (position, target, up_dir) arrays at frame"""
+        if not self._keyframes:
+            raise Exception("camera path has no keyframes")
+        keyframes = self._keyframes
+        if frame <= keyframes[0].frame:
+            start = end = keyframes[0]
+        elif frame >= keyframes[-1].frame:
+            start = end = keyframes[-1]
+        else:
+            index = next(i for i, x in enumerate(keyframes) if x.frame > frame)
+            start, end = keyframes[index - 1], keyframes[index]
+        if start is end:
+            return start.position, start.target, start.up_dir
+        t = ease((frame - start.frame) / float(end.frame - start.frame), end.easing)
+        return tuple(
+            a + (b - a) * t for a, b in (
+                (start.position, end.position),
+                (start.target, end.target),
+                (start.up_dir, end.up_dir),
+            )
+        )
+
+    def camera_at(self, frame):
+        """Camera at frame, its up direction made perpendicular to its facing"""
+        position, target, up_dir = self.pose_at(frame)
+        facing = target - position
+        # remove the part of up along facing(Gram-Schmidt)
+        up_dir = up_dir - facing * (up_dir.dot(facing) / facing.dot(facing))
+        if not up_dir.any():
+            raise Exception("up dir is parallel to facing dir at frame {}".format(frame))
+        return Camera(
+            Point3d(*position.tolist()),
+            Point3d(*target.tolist()),
+            Vector3d.new(Point3d.origin(), Point3d(*up_dir.tolist())),
+            self.projection
+        )
+
+    def shots(self, space, frames, position=(0, 0)):
+        """
+        List of CameraShot drawables of frames 0 to frames - 1 of the path,
+        e.g. animator.add_frames_objects(0, path.shots(space, 60))
+        """
+        return [CameraShot(space, self, i, position) for i in range(frames)]
+
+
+class CameraShot(Drawable):
+    """
+    Frame of a camera path, drawn as the view of a Space3d. The view is
+    rendered only when the frame is composited.
+
+    Attributes
+    ----------
+    _space : Space3d whose objects are viewed
+    _path : CameraPath
+    _frame : frame of the path
+    _position : (x, y) of the top left of the view in the animation frame
+    """
+    __slots__ = ('_space', '_path', '_frame', '_position')
+
+    def __init__(self, space, path, frame, position=(0, 0)):
+        self._space = space
+        self._path = path
+        self._frame = frame
+        self._position = position
+
+    def get_layer(self):
+        image = self._space.render_view(self._path.camera_at(self._frame))
+        return image.convert('RGBA'), self._position
+
+    def get_bounding_box(self):
+        x, y = self._position
+        width, height = self._space.image.size
+        return (x, y, x + width, y + height)
+
+    def copy(self):
+        return self._shallow_copy(CameraShot)
+
+    def set_property(self, prop, value):
+        if prop == POSITION:
+            self._position = value
+        else:
+            raise Exception("Camera shots have no property " + prop)
@@ -0,0 +1,49 @@
+from PIL import ImageColor
+import numpy
+
+
+class Line3d:
+    """
+    Line segment in world coordinates. Space3d.render_scene() draws all of
+    its lines together, from one vertex buffer.
+
+    Attributes
+    ----------
+    start : Point3d where the line starts
+    end : Point3d where the line ends
+    color : pillow color of the line
+    thickness : width of the line in pixels
+    """
+    def __init__(self, start, end, color="white", thickness=1):
+        self.start = start
+        self.end = end
+        self.color = color
+        self.thickness = thickness
+
+    def vertices(self):
+        """Homogeneous coordinates of the ends"""
+        return [[*self.start.to_list(), 1.], [*self.end.to_list(), 1.]]
+
+    def render(self, space):
+        """Draw just this line, render_scene() draws lines in one batch"""
+        space.render_lines([self])
+
+
+def line_buffers(lines):
+    """
+    Gather lines into arrays, returns (vertices, colors, widths) where
+    vertices has shape (2 * N, 4) with the ends of line i at rows 2i and
+    2i + 1, colors are RGBA of shape (N, 4) and widths have shape (N,)
+    """
+    vertices = numpy.empty((2 * len(lines), 4), dtype=numpy.float64)
+    colors = numpy.empty((len(lines), 4), dtype=numpy.uint8)
+    widths = numpy.empty(len(lines), dtype=numpy.float64)
+    rgba = {}  # grids have few colors, convert each once
+    for i, line in enumerate(lines):
+        vertices[2*i:2*i+2] = line.vertices()
+        if line.color not in rgba:
+            color = ImageColor.getrgb(line.color) if isinstance(line.color, str) else line.color
+            rgba[line.color] = (*color, 255)[:4]
+        colors[i] = rgba[line.color]
+        widths[i] = line.thickness
+    return vertices, colors, widths
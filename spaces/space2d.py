@@ -1,14 +1,49 @@
-from PIL import Image, ImageDraw
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageColor
+import numpy
 import math
+import copy
+import sys
+import os
 
-from vector import Vector, Point
+# animator lives in the repository root, so that this runs from spaces/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from vector import Vector, Point  # noqa: E402
+from animator.elements.drawable import Drawable  # noqa: E402
+from animator.timeline import POSITION  # noqa: E402
+from animator.interpolation import interpolate, DEFAULT_EASING  # noqa: E402
+from animator.raster import draw_lines  # noqa: E402
 
-class Space2d:
+STATIC_CACHE_SIZE = 16  # axes and cells layers of different spaces
+DEFAULT_BACKGROUND = "white"
+DEFAULT_AXES_COLOR = "black"
+DEFAULT_CELLS_COLOR = "#999"
+
+
+class Space2d(Drawable):
+    """
+    2d space with axes and cells. It is drawn on its image and saved, or
+    placed on animation frames as a drawable. As a drawable, its axes and
+    cells are rasterized once and only its arrows are drawn on each frame.
+
+    Attributes
+    ----------
+    image : image that draw_axes(), draw_cells(), line() and arrow() draw on
+    arrows : list of (p1, p2, color) drawn over axes and cells of the layer
+    position : (x, y) of the top left of the space in the animation frame
+    background : color of the image
+    axes_color : color of the axes
+    cells_color : color of the lines of the cells
+    """
     ARROW_SIZE = 0.2  # one-fifth of cell size
     ARROW_ANGLE = 30 * math.pi / 180  # 30 degrees
 
-    def __init__(self, width, height, origin_x, origin_y, cell_size=20):
+    def __init__(
+        self, width, height, origin_x, origin_y, cell_size=20, position=(0, 0),
+        background=DEFAULT_BACKGROUND, axes_color=DEFAULT_AXES_COLOR,
+        cells_color=DEFAULT_CELLS_COLOR
+    ):
         if origin_x < 0 or origin_y < 0:
             raise Exception("origin positions can't be negative")
         self.width = width
@@ -16,55 +51,103 @@ class Space2d:
         self.origin_x = origin_x
         self.origin_y = origin_y
         self.cell_size = cell_size
-        self.image = Image.new('RGB', (self.width, self.height), "white")
+        self.background = background
+        self.axes_color = axes_color
+        self.cells_color = cells_color
+        self.image = Image.new('RGB', (self.width, self.height), background)
         self._draw = ImageDraw.Draw(self.image)
+        self.arrows = []
+        self.position = position
 
     def draw_axes(self):
-        self._draw.line(
-            (self.origin_x, 0, self.origin_x, self.height),
-            fill="black", width=2
-        )
-        self._draw.line(
-            (0, self.origin_y, self.width, self.origin_y),
-            fill="black", width=2
+        _draw_axes(
+            self._draw, (self.width, self.height), (self.origin_x, self.origin_y), self.axes_color
         )
 
     def draw_cells(self):
-        # draw y lines in positive x direction
-        w, h, cs = self.width, self.height, self.cell_size
-        ox, oy = self.origin_x, self.origin_y
-        for x in range(ox + cs, w, cs):
-            self._draw.line((x, 0, x, h), fill="#999")
-        # draw y lines in negative x direction
-        for x in range(ox - cs, -1, -cs):
-            self._draw.line((x, 0, x, h), fill="#999")
-        # draw x lines in positive y direction
-        for y in range(oy + cs, h, cs):
-            self._draw.line((0, y, w, y), fill="#999")
-        # draw x lines in negative y direction
-        for y in range(oy - cs, -1, -cs):
-            self._draw.line((0, y, w, y), fill="#999")
+        _draw_cells(self.image, (self.origin_x, self.origin_y), self.cell_size, self.cells_color)
 
     def line(self, p1, p2, color='blue'):
         P1 = self.image_coordinate(p1)
         P2 = self.image_coordinate(p2)
-        self._draw.line((P1.x, P1.y, P2.x, P2.y), fill=color, width=1)
+        draw_lines(self.image, [(P1.x, P1.y)], [(P2.x, P2.y)], color)
 
     def arrow(self, p1, p2, color='blue'):
-        # first draw line
-        self.line(p1, p2, color)
+        # the line and its head are drawn in one batch
+        starts, ends = self._arrow_lines(p1, p2)
+        draw_lines(self.image, starts, ends, color)
+
+    def _arrow_lines(self, p1, p2):
+        """(starts, ends) in image coordinates of the line and head of an arrow"""
+        lines = [(p1, p2)]
         # get opposite vector from p1 to p2
         opposite = Vector(p2, p1)
         r = opposite.length
-        if r <= Space2d.ARROW_SIZE * 2:   # too small to draw arrow
-            return
-        arr_vec = opposite.unit_vector().scale(Space2d.ARROW_SIZE)
-        # arr_vec is unit vector with start point origin, translate it
-        arr_vec = arr_vec.translate(p2)
-        rotated1 = arr_vec.rotate(Space2d.ARROW_ANGLE)
-        rotated2 = arr_vec.rotate(-Space2d.ARROW_ANGLE)
-        self.line(rotated1.start, rotated1.end)
-        self.line(rotated2.start, rotated2.end)
+        if r > Space2d.ARROW_SIZE * 2:   # else too small to draw arrow head
+            arr_vec = opposite.unit_vector.scale(Space2d.ARROW_SIZE)
+            # arr_vec is unit vector with start point origin, translate it
+            arr_vec = arr_vec.translate(p2)
+            rotated1 = arr_vec.rotate(Space2d.ARROW_ANGLE)
+            rotated2 = arr_vec.rotate(-Space2d.ARROW_ANGLE)
+            lines += [
+                (rotated1.start, rotated1.end), (rotated2.start, rotated2.end)
+            ]
+        starts = [self.image_coordinate(x) for x, _ in lines]
+        ends = [self.image_coordinate(x) for _, x in lines]
+        return [(x.x, x.y) for x in starts], [(x.x, x.y) for x in ends]
+
+    def add_arrow(self, p1, p2, color='blue'):
+        """Add an arrow that is drawn on the layer, returns self"""
+        self.arrows.append((p1, p2, color))
+        return self
+
+    def arrow_frames(self, p1, start, end, frames, color='blue', easing=DEFAULT_EASING):
+        """
+        List of frames copies of the space, each with one more arrow from p1
+        to a point moving from start to end, e.g.
+            animator.add_frames_objects(0, space.arrow_frames(o, a, b, 60))
+        """
+        heads = interpolate((start.x, start.y), (end.x, end.y), frames, easing, endpoint=True)
+        return [self.copy().add_arrow(p1, Point(*x), color) for x in heads.tolist()]
+
+    def static_layer(self):
+        """
+        RGBA layer of axes and cells. Layers are cached by size, origin, cell
+        size and colors, so it is shared, copy it before drawing on it.
+        """
+        return _static_layer(
+            (self.width, self.height), (self.origin_x, self.origin_y),
+            self.cell_size, self.background, self.axes_color, self.cells_color
+        )
+
+    def get_layer(self):
+        layer = self.static_layer().copy()
+        starts, ends, colors = [], [], []
+        for p1, p2, color in self.arrows:
+            arrow_starts, arrow_ends = self._arrow_lines(p1, p2)
+            starts += arrow_starts
+            ends += arrow_ends
+            colors += [color] * len(arrow_starts)
+        if starts:
+            # all arrows in one batch
+            draw_lines(layer, starts, ends, colors)
+        return layer, self.position
+
+    def get_bounding_box(self):
+        x, y = self.position
+        return (x, y, x + self.width, y + self.height)
+
+    def copy(self):
+        """Copy sharing the image, with its own list of arrows"""
+        new = copy.copy(self)
+        new.arrows = list(self.arrows)
+        return new
+
+    def set_property(self, prop, value):
+        if prop == POSITION:
+            self.position = value
+        else:
+            raise Exception("Space2d has no property " + prop)
 
     def render(self):
         self.draw_axes()
@@ -91,6 +174,32 @@ class Space2d:
         del self._draw
 
 
+def _draw_axes(draw, size, origin, color):
+    width, height = size
+    draw.line((origin[0], 0, origin[0], height), fill=color, width=2)
+    draw.line((0, origin[1], width, origin[1]), fill=color, width=2)
+
+
+def _draw_cells(image, origin, cell_size, color):
+    """Lines every cell_size pixels from origin, except at origin, set at once"""
+    width, height = image.size
+    xs = [x for x in range(origin[0] % cell_size, width, cell_size) if x != origin[0]]
+    ys = [y for y in range(origin[1] % cell_size, height, cell_size) if y != origin[1]]
+    pixels = numpy.array(image)
+    value = ImageColor.getcolor(color, image.mode)
+    pixels[:, xs] = value
+    pixels[ys, :] = value
+    image.paste(Image.fromarray(pixels, image.mode))
+
+
+@lru_cache(maxsize=STATIC_CACHE_SIZE)
+def _static_layer(size, origin, cell_size, background, axes_color, cells_color):
+    layer = Image.new('RGBA', size, background)
+    _draw_axes(ImageDraw.Draw(layer), size, origin, axes_color)
+    _draw_cells(layer, origin, cell_size, cells_color)
+    return layer
+
+
 if __name__ == '__main__':
     g = Space2d(400, 400, 200, 200, 25)
     p1 = Point.origin()
@@ -1,16 +1,28 @@
-import sys
-sys.path.append('/home/bibek/projects/animator/')
 from PIL import Image, ImageDraw
+import numpy
+import copy
+import sys
+import os
+
+# utils and animator live in the repository root, so that this runs from spaces/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from vector3d import Vector3d, Point3d
-from objects3d import Line3d
-from utils.matrix import Matrix
+from vector3d import Vector3d, Point3d  # noqa: E402
+from objects3d import Line3d, line_buffers  # noqa: E402
+from utils.matrix import Matrix  # noqa: E402
+from animator.elements.drawable import Drawable  # noqa: E402
+from animator.timeline import POSITION  # noqa: E402
+from animator.raster import draw_lines  # noqa: E402
+
+PERPENDICULAR_TOLERANCE = 1e-9  # relative, for directions computed in floats
 
 
 class Projection:
     """
     Projection params in camera coordinate
     Assumption: projection plane is parallel to xy plane, and centers z axis
+    The view frustum is the pyramid from the camera through the plane, cut
+    at the plane, so the plane is also the near plane.
     @plane_distance: distance of plane from origin i.e plane's z coordinate
     @plane_width: width of plane in one direction, total width is 2 times
     @plane_height: height of plane in one direction, total height is 2 times
@@ -49,7 +61,8 @@ class Camera:
         self.up_dir = up_dir
         self.facing_dir = Vector3d.new(self.position, self.target)
         # check if facing_dir and up_dir are perpendicular
-        if self.facing_dir.dot(self.up_dir) != 0.0:
+        tolerance = PERPENDICULAR_TOLERANCE * self.facing_dir.length * self.up_dir.length
+        if abs(self.facing_dir.dot(self.up_dir)) > tolerance:
             raise Exception("facing dir and up dir are not perpendicular")
         self.__matrix = None
         self.projection = projection
@@ -83,12 +96,110 @@ class Camera:
         # now, we have our world coordinate aligned with camera coordinate
         # calculate projection matrix
         proj_mat = self.projection.matrix
-        self.__matrix = proj_mat * alignment_mat * trans_mat
+        self.__matrix = Matrix.compose(proj_mat, alignment_mat, trans_mat)
         return self.__matrix
 
 
-class Space3d:
-    def __init__(self, camera, width, height, depth, cell_size=20):
+def clip_segments(starts, ends, projection):
+    """
+    Clip segments to the view frustum with the Liang-Barsky algorithm, in
+    homogeneous coordinates so that it works for ends behind the camera too
+    Parameters
+    ----------
+    @starts : (N, 4) array of starts of segments, projected by camera matrix
+    @ends : (N, 4) array of ends of segments
+    @projection : Projection, whose plane bounds the frustum
+    Returns (visible, starts, ends) where visible is a boolean array of the
+    segments that are at least partly inside, and starts and ends are cut to
+    the frustum for those
+    """
+    f0 = _frustum_distances(starts, projection)
+    f1 = _frustum_distances(ends, projection)
+    # both ends outside of the same plane, nothing to draw
+    visible = ~((f0 < 0) & (f1 < 0)).any(axis=1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        t = f0 / (f0 - f1)  # where the segment crosses each plane
+    t_enter = numpy.where(f0 < 0, t, 0).max(axis=1)
+    t_exit = numpy.where(f1 < 0, t, 1).min(axis=1)
+    visible &= t_enter <= t_exit
+    # parameters of culled segments may be nan or inf
+    t_enter[~visible], t_exit[~visible] = 0, 1
+    direction = ends - starts
+    return (
+        visible,
+        starts + t_enter[:, None] * direction,
+        starts + t_exit[:, None] * direction
+    )
+
+
+def _frustum_distances(points, projection):
+    """(N, 5) values that are >= 0 when points are inside each frustum plane"""
+    x, y, w = points[:, 0], points[:, 1], points[:, 3]
+    # x and y were scaled by plane_distance, like the plane bounds are
+    width = projection.plane_width * w
+    height = projection.plane_height * w
+    return numpy.stack([
+        w - projection.plane_distance,  # near
+        width + x, width - x,  # left, right
+        height + y, height - y,  # bottom, top
+    ], axis=1)
+
+
+def plane_to_image(points, projection, size):
+    """
+    Map (N, 2) array of points on the projection plane to pixel coordinates
+    of an image of size (width, height), the plane spans the whole image and
+    its y points up
+    """
+    width, height = size
+    pixels = numpy.empty_like(points)
+    pixels[:, 0] = (points[:, 0] + projection.plane_width) * (
+        width / (2. * projection.plane_width)
+    )
+    pixels[:, 1] = (projection.plane_height - points[:, 1]) * (
+        height / (2. * projection.plane_height)
+    )
+    return pixels
+
+
+def _draw_line_buffers(image, camera, vertices, colors, widths):
+    if not len(vertices):
+        return
+    # all the ends are transformed in a single product
+    projected = camera.matrix.transform_points(vertices)
+    # lines outside of the view are culled, others are cut at its sides
+    visible, starts, ends = clip_segments(
+        projected[0::2], projected[1::2], camera.projection
+    )
+    if not visible.any():
+        return
+    starts, ends = starts[visible], ends[visible]
+    # w is at least plane_distance after clipping, safe to divide. Cells are
+    # thin opaque lines, which draw_lines leaves to pillow
+    draw_lines(
+        image,
+        plane_to_image(starts[:, :2] / starts[:, 3:], camera.projection, image.size),
+        plane_to_image(ends[:, :2] / ends[:, 3:], camera.projection, image.size),
+        colors[visible], widths[visible]
+    )
+
+
+class Space3d(Drawable):
+    """
+    3d space of objects viewed by a camera. It is rendered on its image and
+    saved, or placed on animation frames as a drawable. As a drawable, its
+    objects(axes, cells, ...) are rendered once per camera and only the
+    overlay lines are drawn on each frame.
+
+    Attributes
+    ----------
+    camera : Camera the space is viewed from
+    image : image that render_scene() draws on
+    overlay : list of Line3d drawn over the objects on the layer
+    position : (x, y) of the top left of the space in the animation frame
+    _static_layers : {key: RGBA layer of the objects}, shared by copies
+    """
+    def __init__(self, camera, width, height, depth, cell_size=20, position=(0, 0)):
         # NOTE: origin will be in the center of the cube
         #  defined by width, height, depth
         self.camera = camera
@@ -104,6 +215,12 @@ class Space3d:
         self.__objects = []
         self.__rendered = False
         self.__renderer = ImageDraw.Draw(self.image)
+        # vertex buffers of lines in objects, rebuilt when objects are added
+        self.__buffers = None
+        self.__buffers_count = 0
+        self.overlay = []
+        self.position = position
+        self._static_layers = {}
         # TODO: add generic objects later
 
     @property
@@ -215,19 +332,89 @@ class Space3d:
 
     def transform_point(self, point3d):
         pointarr = [*point3d.to_list(), 1.]
-        pointmatrix = Matrix.new([[x] for x in pointarr])
-        result = self.camera.matrix * pointmatrix
-        z = result.array[-1][0]
-        x = result.array[0][0]
-        y = result.array[1][0]
-        try:
-            return [x/z, y/z]
-        except Exception as e:  # DivisionByZero in fact
-            return None
+        x, y, _, z = self.camera.matrix.transform_points([pointarr])[0].tolist()
+        if z < self.camera.projection.plane_distance:
+            return None  # behind the near plane
+        return [x/z, y/z]
+
+    def plane_to_image(self, points):
+        """
+        Map (N, 2) array of points on the projection plane to pixel
+        coordinates, the plane spans the whole image and its y points up
+        """
+        return plane_to_image(points, self.camera.projection, self.image.size)
+
+    def render_lines(self, lines):
+        """Project and draw lines in one batch"""
+        _draw_line_buffers(self.image, self.camera, *line_buffers(lines))
+
+    def line_buffers(self):
+        """
+        Vertex buffers of the Line3d objects, see objects3d.line_buffers. They
+        are built once and reused until objects are added.
+        """
+        if self.__buffers is None or self.__buffers_count != len(self.__objects):
+            lines = [x for x in self.__objects if isinstance(x, Line3d)]
+            self.__buffers = line_buffers(lines)
+            self.__buffers_count = len(self.__objects)
+        return self.__buffers
+
+    def render_view(self, camera):
+        """
+        Render the Line3d objects as seen from camera into a new image and
+        return it, e.g. for a frame of a camera animation. The vertex buffers
+        are shared with render_scene(), only camera's matrix is new.
+        """
+        image = Image.new(self.image.mode, self.image.size, 'black')
+        _draw_line_buffers(image, camera, *self.line_buffers())
+        return image
+
+    def add_overlay(self, line):
+        """Add a Line3d that is drawn over the objects on the layer, returns self"""
+        self.overlay.append(line)
+        return self
+
+    def static_layer(self):
+        """
+        RGBA layer of the objects seen from camera, rendered once per camera
+        and shared, copy it before drawing on it
+        """
+        key = (self.camera.matrix.array.tobytes(), len(self.__objects))
+        layer = self._static_layers.get(key)
+        if layer is None:
+            layer = self.render_view(self.camera).convert('RGBA')
+            self._static_layers.clear()  # only the latest is used
+            self._static_layers[key] = layer
+        return layer
+
+    def get_layer(self):
+        layer = self.static_layer().copy()
+        if self.overlay:
+            _draw_line_buffers(layer, self.camera, *line_buffers(self.overlay))
+        return layer, self.position
+
+    def get_bounding_box(self):
+        x, y = self.position
+        width, height = self.image.size
+        return (x, y, x + width, y + height)
+
+    def copy(self):
+        """Copy sharing objects and static layers, with its own overlay"""
+        new = copy.copy(self)
+        new.overlay = list(self.overlay)
+        return new
+
+    def set_property(self, prop, value):
+        if prop == POSITION:
+            self.position = value
+        else:
+            raise Exception("Space3d has no property " + prop)
 
     def render_scene(self):
+        _draw_line_buffers(self.image, self.camera, *self.line_buffers())
         for obj in self.objects:
-            obj.render(self)
+            if not isinstance(obj, Line3d):
+                obj.render(self)
         self.__rendered = True
 
     def save_scene(self, filepath):
@@ -0,0 +1,7 @@
+import sys
+import os
+
+# spaces modules import their siblings as top level modules(e.g. vector3d)
+SPACES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SPACES not in sys.path:
+    sys.path.append(SPACES)
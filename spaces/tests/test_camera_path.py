@@ -0,0 +1,59 @@
+import numpy
+import pytest
+
+from camera_path import CameraPath, CameraShot
+from space3d import Space3d, Camera, Projection
+from vector3d import Vector3d, Point3d
+from animator.interpolation import ease
+
+
+def new_path():
+    path = CameraPath(Projection(5, 5, 5))
+    path.add_keyframe(20, (10, 0, -50), (0, 0, 0), easing='ease_in')
+    path.add_keyframe(0, (0, 0, -50), (0, 0, 0))  # keyframes are kept sorted
+    return path
+
+
+def test_poses_at_keyframes_and_outside_them():
+    path = new_path()
+    assert [x.frame for x in path.keyframes] == [0, 20]
+    for frame, x in [(-5, 0), (0, 0), (20, 10), (30, 10)]:
+        position, target, up_dir = path.pose_at(frame)
+        assert position.tolist() == [x, 0, -50]
+        assert target.tolist() == [0, 0, 0]
+        assert up_dir.tolist() == [0, 1, 0]
+
+
+def test_poses_between_keyframes_use_the_easing_of_the_next_keyframe():
+    path = new_path()
+    position, _, _ = path.pose_at(5)
+    assert position[0] == pytest.approx(10 * ease(0.25, 'ease_in'))
+    assert position[0] < 2.5  # slower than linear at first
+
+
+def test_duplicate_keyframe_is_rejected():
+    with pytest.raises(Exception):
+        new_path().add_keyframe(0, (0, 0, -10), (0, 0, 0))
+
+
+def test_camera_up_is_made_perpendicular_to_facing():
+    path = CameraPath(Projection(5, 5, 5))
+    path.add_keyframe(0, (0, 0, -50), (0, 0, 0), up_dir=(0, 1, 1))
+    camera = path.camera_at(0)
+    assert camera.facing_dir.dot(camera.up_dir) == pytest.approx(0)
+    assert numpy.allclose(camera.up_dir.to_list(), [0, 1, 0])
+
+
+def test_shots_render_views_of_the_path():
+    up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+    camera = Camera(Point3d(0, 0, -50), Point3d(0, 0, 0), up, Projection(5, 5, 5))
+    space = Space3d(camera, 10, 10, 10, 5)
+    space.add_axes()
+    path = new_path()
+    shots = path.shots(space, 21, position=(3, 4))
+    assert len(shots) == 21 and all(isinstance(x, CameraShot) for x in shots)
+    layer, position = shots[20].get_layer()
+    assert position == (3, 4)
+    assert shots[20].get_bounding_box() == (3, 4, 3 + layer.size[0], 4 + layer.size[1])
+    expected = space.render_view(path.camera_at(20)).convert('RGBA')
+    assert layer.tobytes() == expected.tobytes()
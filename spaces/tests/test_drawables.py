@@ -0,0 +1,55 @@
+import numpy
+
+from space2d import Space2d
+from space3d import Space3d, Camera, Projection
+from objects3d import Line3d
+from vector import Point
+from vector3d import Vector3d, Point3d
+from animator.animator import Animator, AnimatorConfig
+
+
+def composite(drawables, size=(160, 120)):
+    """Frames of an animator showing drawables, one per frame"""
+    animator = Animator(
+        AnimatorConfig(width=size[0], height=size[1], fps=len(drawables), duration=1)
+    )
+    animator.add_frames_objects(0, drawables)
+    return [numpy.asarray(x.convert('RGB'), dtype=int) for x in animator.compile_frames()]
+
+
+def crop(frame, box):
+    left, top, right, bottom = box
+    return frame[top:bottom, left:right]
+
+
+def test_space2d_on_frames_matches_direct_render():
+    space = Space2d(100, 80, 50, 40, 10, position=(20, 30))
+    frames = space.arrow_frames(Point.origin(), Point(3, 0), Point(-2, 3), 3, color='red')
+    for frame, drawable, head in zip(composite(frames), frames, [(3, 0), (0.5, 1.5), (-2, 3)]):
+        direct = Space2d(100, 80, 50, 40, 10)
+        direct.render()
+        direct.arrow(Point.origin(), Point(*head), 'red')
+        expected = numpy.asarray(direct.image, dtype=int)
+        assert drawable.get_bounding_box() == (20, 30, 120, 110)
+        assert numpy.abs(crop(frame, (20, 30, 120, 110)) - expected).max() <= 1
+        assert not frame[:30].any()  # nothing outside of the space
+
+
+def test_space3d_on_frames_matches_direct_render():
+    up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+    camera = Camera(Point3d(0, 0, -50), Point3d(0, 0, 0), up, Projection(5, 5, 5))
+    space = Space3d(camera, 10, 10, 10, 5, position=(10, 5))
+    space.add_axes()
+    space.add_cells()
+    overlays = [Line3d(Point3d(0, 0, 0), Point3d(x, 8, 0), 'red', 2) for x in (2, 6)]
+    drawables = [space.copy().add_overlay(x) for x in overlays]
+    for frame, drawable, overlay in zip(composite(drawables), drawables, overlays):
+        direct = Space3d(camera, 10, 10, 10, 5)
+        direct.add_axes()
+        direct.add_cells()
+        direct.render_scene()
+        direct.render_lines([overlay])
+        expected = numpy.asarray(direct.image, dtype=int)
+        assert drawable.get_bounding_box() == (10, 5, 60, 55)
+        assert numpy.abs(crop(frame, (10, 5, 60, 55)) - expected).max() <= 1
+    assert space.overlay == []  # copies have their own overlay
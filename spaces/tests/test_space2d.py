@@ -0,0 +1,30 @@
+import space2d
+from space2d import Space2d
+
+
+def test_static_layer_is_cached_by_size_origin_cell_size_and_colors():
+    space2d._static_layer.cache_clear()
+    layer = Space2d(60, 40, 30, 20, 10).static_layer()
+    # another space with the same settings, and copies, reuse the layer
+    assert Space2d(60, 40, 30, 20, 10, position=(5, 5)).static_layer() is layer
+    assert Space2d(60, 40, 30, 20, 10).copy().static_layer() is layer
+    assert space2d._static_layer.cache_info().hits == 2
+    changed = [
+        Space2d(80, 40, 30, 20, 10),
+        Space2d(60, 40, 20, 20, 10),
+        Space2d(60, 40, 30, 20, 5),
+        Space2d(60, 40, 30, 20, 10, background="black"),
+        Space2d(60, 40, 30, 20, 10, axes_color="red"),
+        Space2d(60, 40, 30, 20, 10, cells_color="blue"),
+    ]
+    layers = [x.static_layer() for x in changed]
+    assert all(x is not layer for x in layers)
+    assert space2d._static_layer.cache_info().misses == 1 + len(changed)
+    assert layers[4].getpixel((30, 5)) == (255, 0, 0, 255)  # on the y axis
+    assert layers[5].getpixel((10, 5)) == (0, 0, 255, 255)  # on a cell line
+
+
+def test_static_layer_matches_render():
+    space = Space2d(60, 40, 30, 20, 10, axes_color="red")
+    space.render()
+    assert space.static_layer().convert('RGB').tobytes() == space.image.tobytes()
@@ -0,0 +1,94 @@
+from PIL import Image
+import numpy
+
+from space3d import Space3d, Camera, Projection, clip_segments
+from objects3d import Line3d, line_buffers
+from vector3d import Vector3d, Point3d
+from animator.raster import draw_lines
+
+
+def new_space(position=(0, 0, -50), size=10, cell_size=5):
+    up = Vector3d.new(Point3d.origin(), Point3d(0, 1, 0))
+    camera = Camera(Point3d(*position), Point3d(0, 0, 0), up, Projection(5, 5, 5))
+    return Space3d(camera, size, size, size, cell_size)
+
+
+def test_buffers_have_ends_colors_and_widths_of_lines():
+    lines = [
+        Line3d(Point3d(1, 2, 3), Point3d(4, 5, 6), color="red", thickness=2),
+        Line3d(Point3d(-1, 0, 0), Point3d(1, 0, 0), color=(0, 0, 255)),
+    ]
+    vertices, colors, widths = line_buffers(lines)
+    assert vertices.tolist() == [[1, 2, 3, 1], [4, 5, 6, 1], [-1, 0, 0, 1], [1, 0, 0, 1]]
+    assert colors.tolist() == [[255, 0, 0, 255], [0, 0, 255, 255]]
+    assert widths.tolist() == [2, 1]
+
+
+def test_buffers_render_like_lines_projected_one_by_one():
+    space = new_space()
+    space.add_axes()
+    space.add_cells()
+    space.render_scene()
+    # project every end with transform_point and draw the lines one by one
+    expected = Image.new('RGB', space.image.size, 'black')
+    lines = [x for x in space.objects if isinstance(x, Line3d)]
+    _, colors, widths = line_buffers(lines)
+    for line, color, width in zip(lines, colors, widths):
+        ends = [space.transform_point(x) for x in (line.start, line.end)]
+        start, end = space.plane_to_image(numpy.array(ends))
+        draw_lines(expected, [start], [end], tuple(color), width)
+    assert numpy.asarray(expected).any()
+    diff = numpy.asarray(space.image, dtype=int) - numpy.asarray(expected, dtype=int)
+    assert numpy.abs(diff).max() <= 1  # one by one is rounded to uint8 each time
+
+
+def clip(starts, ends):
+    # plane at distance 5 spans -2..2, points are in clip coordinates(x, y, z, w)
+    return clip_segments(
+        numpy.array(starts, dtype=float), numpy.array(ends, dtype=float), Projection(5, 2, 2)
+    )
+
+
+def test_segment_inside_is_kept_whole():
+    visible, starts, ends = clip([[0, 0, 0, 10], [-5, 3, 0, 8]], [[10, 10, 0, 10], [5, -3, 0, 20]])
+    assert visible.tolist() == [True, True]
+    assert starts.tolist() == [[0, 0, 0, 10], [-5, 3, 0, 8]]
+    assert ends.tolist() == [[10, 10, 0, 10], [5, -3, 0, 20]]
+
+
+def test_segment_outside_is_culled():
+    visible, _, _ = clip(
+        [[0, 0, 0, -10], [30, 0, 0, 10], [0, -30, 0, 10], [30, 15, 0, 10]],
+        [[0, 0, 0, -1], [40, 0, 0, 10], [0, -50, 0, 20], [15, 30, 0, 10]]
+    )
+    # behind the camera, right of view, below view, across a corner outside
+    assert visible.tolist() == [False, False, False, False]
+
+
+def test_segment_crossing_near_plane_is_cut_at_it():
+    visible, starts, ends = clip([[0, 0, 0, -10]], [[0, 0, 0, 20]])
+    assert visible.tolist() == [True]
+    assert starts.tolist() == [[0, 0, 0, 5]]  # w is plane_distance at the near plane
+    assert ends.tolist() == [[0, 0, 0, 20]]
+
+
+def test_segment_crossing_side_plane_is_cut_at_it():
+    visible, starts, ends = clip([[0, 0, 0, 10]], [[40, 0, 0, 10]])
+    assert visible.tolist() == [True]
+    assert starts.tolist() == [[0, 0, 0, 10]]
+    assert ends.tolist() == [[20, 0, 0, 10]]  # x is plane_width * w at the right plane
+
+
+def test_frames_inside_the_view_render_as_without_clipping():
+    space = new_space()
+    space.add_axes()
+    space.add_cells()
+    space.render_scene()
+    # the rendering before clipping: divide by w, map to pixels and draw
+    vertices, colors, widths = space.line_buffers()
+    projected = space.camera.matrix.transform_points(vertices)
+    pixels = space.plane_to_image(projected[:, :2] / projected[:, 3:])
+    expected = draw_lines(
+        Image.new('RGB', space.image.size, 'black'), pixels[0::2], pixels[1::2], colors, widths
+    )
+    assert numpy.array_equal(numpy.asarray(space.image), numpy.asarray(expected))
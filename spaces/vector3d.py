@@ -24,7 +24,7 @@ class Point3d(Point):
         return self.__z
 
     def __sub__(self, point):
-        return self.new(self.x + point.x, self.y - point.y, self.z - point.z)
+        return self.new(self.x - point.x, self.y - point.y, self.z - point.z)
 
     def __add__(self, point):
         return self.new(self.x + point.x, self.y + point.y, self.z + point.z)
@@ -42,7 +42,6 @@ def test_animator():
     tex = TEX(texconf)
     animator.add_frames_objects(0, tex.fade_in(animator.total_frames))
 
-    animator.compile_frames()
     animator.add_audio(r'/home/bibek/Music/short-clip.mp3')
 
     animator.convert_to_video('/tmp/cheap.mp4')
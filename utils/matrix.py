@@ -1,5 +1,7 @@
-import random
-from copy import copy
+from functools import lru_cache
+import numpy
+
+COMPOSE_CACHE_SIZE = 256
 
 
 def dot(arr1, arr2):
@@ -9,13 +11,21 @@ def dot(arr1, arr2):
 
 
 class Matrix:
+    """
+    Matrix backed by a contiguous float64 NumPy array. Matrices are not
+    modified by any operation, operations return new matrices.
+
+    Attributes
+    ----------
+    _array : numpy array of shape (rows, cols)
+    """
     def __init__(self, rows, cols, arr=None):
         self.__rows = rows
         self.__cols = cols
-        self._array = [
-                        [random.random() for _ in range(cols)]
-                        for _ in range(rows)
-                      ] if not arr else copy(arr)
+        if arr is None or not len(arr):
+            self._array = numpy.random.random((rows, cols))
+        else:
+            self._array = numpy.array(arr, dtype=numpy.float64, order='C')
 
     @property
     def rows(self):
@@ -26,62 +36,95 @@ class Matrix:
         return self.__cols
 
     def get_row(self, index):
-        return self._array[index]
+        return self._array[index].tolist()
 
     def get_column(self, index):
-        return [x[index] for x in self._array]
+        return self._array[:, index].tolist()
 
     def transpose(self):
-        newarr = [self.get_column(x) for x in range(self.cols)]
-        return self.new(newarr)
+        return self.new(self._array.T)
 
     @classmethod
     def identity(cls, size):
-        arr = []
-        for x in range(size):
-            row = []
-            for y in range(size):
-                if x == y:
-                    row.append(1.)
-                else:
-                    row.append(0)
-            arr.append(row)
-        return cls.new(arr)
+        return cls.new(numpy.identity(size))
 
     @property
     def array(self):
+        """The numpy array, indexed like the list of rows, e.g. array[i][j]"""
         return self._array
 
     @classmethod
     def new_zero_matrix(cls, rows, cols):
-        arr = [[0 for _ in range(cols)] for _ in range(rows)]
-        return cls(rows, cols, arr)
+        return cls(rows, cols, numpy.zeros((rows, cols)))
 
     @classmethod
     def new(cls, arr):
-        rows = len(arr)
-        cols = len(arr[0])
-        if not arr or not isinstance(arr, list) or not cols:
-            raise Exception('invalid array')
-        if not all(map(lambda x: len(x) == cols, arr)):
+        try:
+            arr = numpy.array(arr, dtype=numpy.float64, order='C')
+        except ValueError:
             raise Exception('invalid size')
-        return cls(rows, cols, arr)
+        if arr.ndim != 2 or not arr.size:
+            raise Exception('invalid array')
+        return cls(arr.shape[0], arr.shape[1], arr)
 
     def __mul__(self, mat):
+        """
+        Matrix product with a Matrix, or with a numpy array of shape (cols, N),
+        e.g. N points as columns, which returns a numpy array of shape (rows, N)
+        """
+        if isinstance(mat, numpy.ndarray):
+            if mat.shape[0] != self.cols:
+                raise Exception('sizes do not match')
+            return self._array @ mat
         if self.cols != mat.rows:
             raise Exception('sizes do not match')
-        result = []
-        for i in range(self.rows):
-            row = []
-            for j in range(mat.cols):
-                row.append(dot(self.get_row(i), mat.get_column(j)))
-            result.append(row)
-        return self.new(result)
+        return self.new(self._array @ mat._array)
+
+    def transform_points(self, points):
+        """
+        Transform points given as rows, array of shape (N, cols), in one
+        product. Returns array of shape (N, rows).
+        """
+        points = numpy.asarray(points, dtype=numpy.float64)
+        if points.ndim != 2 or points.shape[1] != self.cols:
+            raise Exception('sizes do not match')
+        return points @ self._array.T
+
+    def inverse(self):
+        if self.rows != self.cols:
+            raise Exception('only square matrices can be inverted')
+        try:
+            return self.new(numpy.linalg.inv(self._array))
+        except numpy.linalg.LinAlgError:
+            raise Exception('matrix is not invertible')
+
+    @classmethod
+    def compose(cls, *matrices):
+        """
+        Product of matrices from left to right. Products are cached by the
+        values of the matrices, so composing the same transforms again, e.g.
+        for every frame, does not multiply them again.
+        """
+        for a, b in zip(matrices, matrices[1:]):
+            if a.cols != b.rows:
+                raise Exception('sizes do not match')
+        keys = tuple((x._array.shape, x._array.tobytes()) for x in matrices)
+        return cls.new(_compose(keys))
 
     def __str__(self):
         string = ''
-        for row in self._array:
+        for row in self._array.tolist():
             for e in row:
                 string += str(e) + "  "
             string += '\n'
         return string
+
+
+@lru_cache(maxsize=COMPOSE_CACHE_SIZE)
+def _compose(keys):
+    arrays = [numpy.frombuffer(data).reshape(shape) for shape, data in keys]
+    product = arrays[0]
+    for array in arrays[1:]:
+        product = product @ array
+    product.flags.writeable = False  # shared by every hit of the cache
+    return product
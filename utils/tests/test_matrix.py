@@ -0,0 +1,36 @@
+import numpy
+
+from utils.matrix import Matrix, _compose
+
+
+def test_product_and_rows():
+    a = Matrix.new([[1, 2], [3, 4]])
+    b = Matrix.new([[0, 1], [1, 0]])
+    product = a * b
+    assert (product.rows, product.cols) == (2, 2)
+    assert product.get_row(0) == [2, 1]
+    assert product.get_column(1) == [1, 3]
+    assert product.array[1][0] == 4
+    assert a.transpose().get_row(0) == [1, 3]
+
+
+def test_batched_points_and_inverse():
+    m = Matrix.new([[2, 0, 0, 1], [0, 3, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
+    points = numpy.array([[1, 1, 1, 1], [2, 0, 5, 1]], dtype=float)
+    assert m.transform_points(points).tolist() == [[3, 3, 1, 1], [5, 0, 5, 1]]
+    assert (m * points.T).T.tolist() == m.transform_points(points).tolist()
+    identity = (m * m.inverse()).array
+    assert numpy.allclose(identity, numpy.identity(4))
+
+
+def test_compose_is_cached():
+    a = Matrix.new([[1, 2], [3, 4]])
+    b = Matrix.new([[0, 1], [1, 0]])
+    c = Matrix.identity(2)
+    assert Matrix.compose(a, b, c).array.tolist() == (a * b * c).array.tolist()
+    first = Matrix.compose(a, b)
+    hits = _compose.cache_info().hits
+    # equal values hit the cache even for different objects
+    again = Matrix.compose(Matrix.new([[1, 2], [3, 4]]), b)
+    assert _compose.cache_info().hits == hits + 1
+    assert again.array.tolist() == first.array.tolist()